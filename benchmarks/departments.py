@@ -0,0 +1,79 @@
+"""
+Benchmarks parsing campus course catalog index pages for 'departments'
+
+    python benchmarks/departments.py crscat.html crscatb.html crscatt.html
+
+Run with uwtools installed (i.e. 'pip install -e .'). Each argument is a saved index page (i.e. https://www.washington.edu/students/crscat/).
+The one-pass parser is compared against the previous parser, which re-parsed each college
+section of the page separately, and against reading the result from the memo.
+"""
+
+import re, sys, time, tempfile, os
+from unicodedata import normalize
+from bs4 import BeautifulSoup
+
+os.environ.setdefault('UWTOOLS_CACHE', tempfile.mkdtemp())
+from uwtools import parse_courses
+
+
+def previous_departments(source):
+    """ The parser before the one-pass parser, kept as the reference for results and timing """
+    departments = {}
+    source = BeautifulSoup(source.rsplit('class="col-md-4 uw-sidebar"', 1)[0], features='lxml')
+    college_names = [c.get_text() for c in source.find_all('h2', {'id': re.compile(r'[A-Za-z]+')})]
+    colleges = str(source).split('<h2 id=')
+    for i, college in enumerate(colleges[1:]):
+        departments[college_names[i]] = {}
+        college = BeautifulSoup(college, features='lxml')
+        for dep_name in college.find_all('a'):
+            dep_name = normalize('NFKD', dep_name.text)
+            try:
+                full_name, abbrev = dep_name.rsplit('(', 1)
+            except ValueError:
+                pass
+            else:
+                if '(' in dep_name and '--' not in dep_name:
+                    abbrev = abbrev.replace(' ', '')[:-1]
+                    if not abbrev.startswith('See'):
+                        departments[college_names[i]][abbrev] = full_name.strip()
+    return departments
+
+
+def timeit(function, sources, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for source in sources:
+            function(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(paths, repeat=5):
+    sources = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            sources.append(f.read())
+
+    for path, source in zip(paths, sources):
+        assert parse_courses.parse_departments_page(source) == previous_departments(source), \
+            f'Results differ for {path}'
+
+    # Fill the memo once so the last timing only measures lookups
+    for source in sources:
+        parse_courses.campus_departments(source)
+
+    timings = {
+        'previous parser': timeit(previous_departments, sources, repeat),
+        'one-pass parser': timeit(parse_courses.parse_departments_page, sources, repeat),
+        'memo lookup': timeit(parse_courses.campus_departments, sources, repeat),
+    }
+    baseline = timings['previous parser']
+    for name, seconds in timings.items():
+        print(f'{name:>16}: {seconds * 1000:9.2f} ms  ({baseline / seconds:6.1f}x)')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    main(sys.argv[1:])
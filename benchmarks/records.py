@@ -0,0 +1,110 @@
+"""
+Benchmarks building the struct='dict' output of 'time_schedules' and 'course_catalogs'
+
+    python benchmarks/records.py [sections] [courses]
+
+Run with uwtools installed (i.e. 'pip install -e .'). Parsed rows are generated, so
+nothing is downloaded. The records built straight from the parsed rows are compared
+against the previous path, which built the DataFrame and converted it with 'to_dict',
+for latency and peak memory (measured with tracemalloc).
+"""
+
+import sys, time, random, tracemalloc
+import pandas as pd
+from uwtools import parse_schedules, parse_courses
+from uwtools.columnar import Columns
+
+CAMPUSES = ['Seattle', 'Bothell', 'Tacoma']
+
+
+def schedule_rows(count):
+    """ Generates 'count' rows per campus in the layout returned by 'parse_schedules' """
+    rng = random.Random(0)
+    buildings = ['MGH', 'KNE', 'CSE', 'UW1', 'UW2', 'CP', 'GWP', 'BB']
+    rows = []
+    for i in range(count):
+        rows.append([f'CSE{100 + i % 400}', str(rng.randint(10, 300)), str(10000 + i), 'A',
+                     'LECT', rng.choice(['MWF', 'TTh', 'MW']), rng.choice(['930-1020', '1130-1220', '130-220P']),
+                     rng.choice(buildings), str(rng.randint(100, 400))])
+    return rows
+
+
+def catalog_columns(count):
+    """ Generates 'count' parsed courses per campus and the departments of their colleges """
+    courses = Columns(parse_courses.COLUMN_NAMES)
+    departments = {}
+    for campus in CAMPUSES:
+        prefix = campus[0] if campus != 'Seattle' else ''
+        departments[campus] = {f'College of {prefix}A': {f'{prefix}CSE': 'Computer Science'}}
+        courses.extend([campus, f'{prefix}CSE', str(i), f'Course Title {i}', '5', 'NW', 'A,W,Sp', '',
+                        f'{prefix}CSE{i - 1}', '', f'Description of course {i}. ' * 8] for i in range(count))
+    return courses, departments
+
+
+def previous_schedules(rows):
+    """ The struct='dict' path of 'gather' before the records path, kept as the reference """
+    time_schedules = pd.DataFrame()
+    for campus in CAMPUSES:
+        df = pd.DataFrame(rows, columns=parse_schedules.COURSE_KEYS)
+        df['Campus'] = campus
+        df['Year'] = 2024
+        df['Quarter'] = 'AUT'
+        time_schedules = pd.concat([time_schedules, df])
+    time_schedules.index = range(len(time_schedules.index))
+    time_schedules.index.name = 'Index'
+    return time_schedules.to_dict(orient='records')
+
+
+def records_schedules(rows):
+    """ The struct='dict' path of 'parse_departments' and 'gather' """
+    records = []
+    for campus in CAMPUSES:
+        records.extend(parse_schedules.row_records(rows, campus, 2024, 'AUT'))
+    return parse_schedules.schedule_records(records, False, False, False)
+
+
+def measure(function, *args, repeat=3):
+    """
+    Returns
+
+        The best time in seconds and the peak memory in bytes of calling 'function'
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def report(title, timings):
+    print(title)
+    baseline = timings['previous'][0]
+    for name, (seconds, peak) in timings.items():
+        print(f'{name:>12}: {seconds * 1000:9.2f} ms  ({baseline / seconds:5.1f}x)  peak {peak / 2 ** 20:8.1f} MiB')
+
+
+def main(sections=20000, courses=5000):
+    rows = schedule_rows(sections)
+    assert previous_schedules(rows) == records_schedules(rows), 'Time Schedule records differ'
+    report(f'time_schedules, {sections * len(CAMPUSES)} sections', {
+        'previous': measure(previous_schedules, rows),
+        'records': measure(records_schedules, rows),
+    })
+
+    columns, departments = catalog_columns(courses)
+    previous_catalog = lambda: parse_courses.catalog_frame(columns, departments).to_dict(orient='index')
+    assert previous_catalog() == parse_courses.catalog_records(columns, departments), 'Catalog records differ'
+    report(f'course_catalogs, {courses * len(CAMPUSES)} courses', {
+        'previous': measure(previous_catalog),
+        'records': measure(parse_courses.catalog_records, columns, departments),
+        'tuples': measure(parse_courses.catalog_records, columns, departments, 'tuples'),
+    })
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -16,9 +16,16 @@ setuptools.setup(name='uwtools',
       install_requires=[
           'tqdm',
           'pandas',
+          'numpy',
           'beautifulsoup4',
           'requests'
       ],
+      entry_points={
+          'console_scripts': ['uwtools=uwtools.__main__:main']
+      },
+      extras_require={
+          'arrow': ['pyarrow']
+      },
       package_data = {
           'uwtools': ['*']
       },
@@ -5,6 +5,21 @@ from .parse_courses import get_departments as departments
 
 from .parse_schedules import gather as time_schedules
 from .parse_schedules import get_academic_year as academic_year
+from .parse_schedules import latest_quarter
+from .parse_schedules import Section
 
 from .parse_buildings import get_buildings as buildings
-from .parse_buildings import geocode
\ No newline at end of file
+from .parse_buildings import geocode
+from .resolver import BuildingResolver
+
+from .offerings import course_offerings
+
+from .fetch import configure as configure_requests
+from .bundle import Bundle, snapshot_schedules, snapshot_catalog
+
+from .search import CatalogIndex
+from .seats import SeatPoller, SeatSeries
+from .rooms import RoomOccupancy
+from .planner import DegreePlanner
+from .history import CatalogHistory
+from .similar import SimilarityIndex, similar_courses
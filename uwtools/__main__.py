@@ -0,0 +1,122 @@
+"""
+Command line interface of uwtools
+
+    uwtools enqueue QUEUE schedules --year 2024 --quarter AUT
+    uwtools enqueue QUEUE catalogs
+    uwtools worker QUEUE OUTPUT
+    uwtools merge OUTPUT merged.json --kind schedule
+    uwtools serve --port 8000 --year 2024 --quarter AUT
+    uwtools snapshot schedules Seattle-AUT2024.bundle --campus Seattle --year 2024 --quarter AUT
+"""
+
+import sys, json, argparse
+from . import shard, bundle, serve
+
+CAMPUS_NAMES = ['Seattle', 'Bothell', 'Tacoma']
+
+
+def enqueue(args):
+    queue = shard.open_queue(args.queue)
+    if args.kind == 'schedules':
+        if args.year is None or args.quarter is None:
+            sys.exit('"--year" and "--quarter" are required to enqueue schedules')
+        units = shard.schedule_units(args.year, args.quarter, args.campuses)
+    else:
+        units = shard.catalog_units(args.campuses)
+    queue.put(units)
+    print(f'Enqueued {len(units)} units')
+
+
+def worker(args):
+    queue = shard.open_queue(args.queue)
+    if args.requeue is not None and isinstance(queue, shard.FileQueue):
+        queue.requeue(older_than=args.requeue)
+    processed = shard.work(queue, args.output, use_cache=not args.no_cache, delay=args.delay,
+                           max_units=args.max_units)
+    print(f'Processed {processed} units')
+
+
+def merge(args):
+    # The shards are read once, into the structure the destination is written from
+    csv = args.destination.endswith('.csv')
+    merged = shard.merge(args.output, kind=args.kind, struct='df' if csv else 'dict')
+    if csv:
+        merged.to_csv(args.destination)
+    else:
+        with open(args.destination, mode='w') as f:
+            json.dump(merged, f)
+    print(f'Merged {len(merged)} rows into {args.destination}')
+
+
+def snapshot(args):
+    if args.kind == 'schedules':
+        if args.year is None or args.quarter is None:
+            sys.exit('"--year" and "--quarter" are required to snapshot schedules')
+        pages = bundle.snapshot_schedules(args.campus, args.year, args.quarter, args.path)
+    else:
+        pages = bundle.snapshot_catalog(args.campus, args.path)
+    print(f'Stored {pages} pages in {args.path}')
+
+
+def run_server(args):
+    print(f'Serving on http://{args.host}:{args.port}')
+    serve.serve(args.host, args.port, args.year, args.quarter, args.campuses,
+                refresh=args.refresh or None, use_cache=not args.no_cache, quiet=not args.verbose)
+
+
+def parser():
+    main_parser = argparse.ArgumentParser(prog='uwtools', description='UW Time Schedule and Course Catalog tools')
+    commands = main_parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('enqueue', help='Plan work units and add them to a work queue')
+    p.add_argument('queue', help='Queue directory, or module:attribute of a WorkQueue backend')
+    p.add_argument('kind', choices=['schedules', 'catalogs'])
+    p.add_argument('--year', type=int)
+    p.add_argument('--quarter', choices=['AUT', 'WIN', 'SPR', 'SUM'])
+    p.add_argument('--campuses', nargs='+', default=CAMPUS_NAMES, type=str.title, choices=CAMPUS_NAMES)
+    p.set_defaults(func=enqueue)
+
+    p = commands.add_parser('worker', help='Process work units until the queue is empty')
+    p.add_argument('queue', help='Queue directory, or module:attribute of a WorkQueue backend')
+    p.add_argument('output', help='Directory shards are written to')
+    p.add_argument('--delay', type=float, default=0, help='Seconds to wait between units')
+    p.add_argument('--max-units', type=int, default=None)
+    p.add_argument('--no-cache', action='store_true', help='Do not use the parse memo')
+    p.add_argument('--requeue', type=float, default=None, metavar='SECONDS',
+                   help='First move units claimed longer ago than SECONDS back to pending')
+    p.set_defaults(func=worker)
+
+    p = commands.add_parser('merge', help='Combine worker shards into one dataset')
+    p.add_argument('output', help='Directory the shards were written to')
+    p.add_argument('destination', help='.csv or .json file to write')
+    p.add_argument('--kind', choices=['schedule', 'catalog'], default='schedule')
+    p.set_defaults(func=merge)
+
+    p = commands.add_parser('snapshot', help='Store the raw pages of a campus in a bundle')
+    p.add_argument('kind', choices=['schedules', 'catalogs'])
+    p.add_argument('path', help='Bundle file to write')
+    p.add_argument('--campus', required=True, type=str.title, choices=CAMPUS_NAMES)
+    p.add_argument('--year', type=int)
+    p.add_argument('--quarter', choices=['AUT', 'WIN', 'SPR', 'SUM'])
+    p.set_defaults(func=snapshot)
+
+    p = commands.add_parser('serve', help='Answer JSON queries from data kept in memory')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8000)
+    p.add_argument('--year', type=int, help='Defaults to the latest published quarter')
+    p.add_argument('--quarter', choices=['AUT', 'WIN', 'SPR', 'SUM'])
+    p.add_argument('--campuses', nargs='+', default=CAMPUS_NAMES, type=str.title, choices=CAMPUS_NAMES)
+    p.add_argument('--refresh', type=float, default=900, help='Seconds between refreshes, 0 to never refresh')
+    p.add_argument('--no-cache', action='store_true', help='Do not use the parse memo')
+    p.add_argument('--verbose', action='store_true', help='Log every request')
+    p.set_defaults(func=run_server)
+    return main_parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
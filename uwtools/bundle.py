@@ -0,0 +1,269 @@
+"""
+Snapshot bundles of raw Time Schedule and Course Catalog pages. A bundle is one file per
+campus-quarter holding every page, each compressed on its own, followed by an index of
+page offsets. Pages are read through mmap, so any page can be read without loading the rest.
+
+Layout:
+
+    MAGIC | page 1 | page 2 | ... | index | index offset, index length, MAGIC
+
+where each page is zlib compressed and the index is zlib compressed JSON of
+{'metadata': {...}, 'pages': {url: [offset, length]}}.
+"""
+
+import os, json, mmap, struct, tempfile
+from zlib import compress, decompress
+import concurrent.futures as cf
+from . import fetch
+
+MAGIC = b'UWTBNDL1'
+FOOTER = struct.Struct('<QQ8s')
+
+
+class BundlePage:
+    """ Page read from a bundle, with the attributes of a requests Response used by the parsers """
+    __slots__ = ('url', 'text', 'ok', 'status_code')
+
+    def __init__(self, url, text):
+        self.url = url
+        self.text = text if text is not None else ''
+        self.ok = text is not None
+        self.status_code = 200 if self.ok else 404
+
+
+class Bundle:
+    """
+    Read-only snapshot bundle
+
+    @params
+
+        'path': The bundle file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, mode='rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # The mmap is closed if the bundle can not be read, i.e. a corrupt index
+        try:
+            if self.data[:len(MAGIC)] != MAGIC or len(self.data) < len(MAGIC) + FOOTER.size:
+                raise ValueError(f'{path} is not a uwtools bundle')
+            offset, length, magic = FOOTER.unpack(self.data[-FOOTER.size:])
+            if magic != MAGIC:
+                raise ValueError(f'{path} is an incomplete uwtools bundle')
+            index = json.loads(decompress(self.data[offset:offset + length]))
+            self.metadata = index['metadata']
+            self.pages = index['pages']
+        except BaseException:
+            self.data.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, url):
+        return url in self.pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def close(self):
+        self.data.close()
+
+    def read(self, url):
+        """
+        Returns
+
+            The page source stored for 'url', or None if the bundle does not have it
+        """
+        location = self.pages.get(url)
+        if location is None:
+            return None
+        offset, length = location
+        return decompress(self.data[offset:offset + length]).decode('utf-8')
+
+    def get(self, url):
+        """
+        Reads a page the way 'fetch.get' downloads one
+
+        Returns
+
+            A BundlePage, with 'ok' False if the bundle does not have the page
+        """
+        return BundlePage(url, self.read(url))
+
+
+class BundleSet:
+    """
+    Several bundles read as one, i.e. one bundle per campus for the same quarter
+
+    @params
+
+        'bundles': A list of Bundles
+
+        'owned': The Bundles of 'bundles' that were opened for this set, closed by 'close'
+    """
+
+    def __init__(self, bundles, owned=()):
+        self.bundles = bundles
+        self.owned = list(owned)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Closes the bundles opened for this set, those given as Bundles stay open """
+        for bundle in self.owned:
+            bundle.close()
+        self.owned = []
+
+    def __contains__(self, url):
+        return any(url in b for b in self.bundles)
+
+    def get(self, url):
+        for bundle in self.bundles:
+            if url in bundle:
+                return bundle.get(url)
+        return BundlePage(url, None)
+
+
+def open_bundles(bundles):
+    """
+    Opens the bundles given to the 'bundle' parameter of the parsers
+
+    @params
+
+        'bundles': A Bundle or path, or a list of Bundles and paths
+
+    Returns
+
+        An object with a 'get' method for reading pages. Unless 'bundles' was already
+        opened, it must be closed by the caller (i.e. with 'close_bundles').
+    """
+    if isinstance(bundles, (Bundle, BundleSet)):
+        return bundles
+    if isinstance(bundles, (str, os.PathLike)):
+        return Bundle(bundles)
+    owned = []
+    try:
+        for b in bundles:
+            if not isinstance(b, Bundle):
+                owned.append(Bundle(b))
+    except Exception:
+        for bundle in owned:
+            bundle.close()
+        raise
+    opened = iter(owned)
+    return BundleSet([b if isinstance(b, Bundle) else next(opened) for b in bundles], owned)
+
+
+def close_bundles(opened, bundles):
+    """
+    Closes what 'open_bundles' opened for the 'bundles' argument of a parser, leaving
+    the Bundles the caller opened itself open
+    """
+    if opened is not None and opened is not bundles:
+        opened.close()
+
+
+def write_bundle(path, pages, metadata=None):
+    """
+    Writes pages into a new bundle
+
+    @params
+
+        'path': The bundle file to write, replaced atomically if it exists
+
+        'pages': An iterable of (url, page source) pairs
+
+        'metadata': JSON serializable information stored with the bundle
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    try:
+        index = {}
+        with os.fdopen(fd, mode='wb') as f:
+            f.write(MAGIC)
+            offset = len(MAGIC)
+            for url, text in pages:
+                data = compress(text.encode('utf-8'))
+                f.write(data)
+                index[url] = [offset, len(data)]
+                offset += len(data)
+            data = compress(json.dumps({'metadata': metadata or {}, 'pages': index}).encode())
+            f.write(data)
+            f.write(FOOTER.pack(offset, len(data), MAGIC))
+        # mkstemp creates the file readable by the owner only
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def download_pages(urls):
+    """ Downloads the given urls in parallel, skipping pages that are not available """
+    with cf.ThreadPoolExecutor() as executor:
+        for url, response in zip(urls, executor.map(fetch.get, urls)):
+            if response.ok:
+                yield url, response.text
+
+
+def snapshot_schedules(campus, year, quarter, path):
+    """
+    Downloads the Time Schedule index and every department page of a campus and
+    quarter into a bundle
+
+    @params
+
+        'campus': The campus to snapshot
+
+        'year': The year of the Time Schedules
+
+        'quarter': The quarter of the Time Schedules ('AUT', 'WIN', 'SPR' or 'SUM')
+
+        'path': The bundle file to write
+
+    Returns
+
+        The number of pages stored
+    """
+    from .parse_schedules import CAMPUSES_TIMES, plan_departments
+    campus = campus.title()
+    plan = plan_departments(campus, int(year), quarter)
+    if plan is None:
+        raise ValueError(f'The {quarter} {year} Time Schedules for {campus} are not available')
+    index = '{}{}{}/'.format(CAMPUSES_TIMES[campus]['link'], quarter, year)
+    pages = list(download_pages([index] + [link for _, link in plan]))
+    write_bundle(path, pages, {'kind': 'schedule', 'campus': campus, 'year': int(year), 'quarter': quarter})
+    return len(pages)
+
+
+def snapshot_catalog(campus, path):
+    """
+    Downloads the Course Catalog index and every department page of a campus into a bundle
+
+    @params
+
+        'campus': The campus to snapshot
+
+        'path': The bundle file to write
+
+    Returns
+
+        The number of pages stored
+    """
+    from .parse_courses import CAMPUSES, plan_catalog
+    campus = campus.title()
+    # An error page would be stored as an index without departments
+    index = fetch.check(fetch.get(CAMPUSES[campus])).text
+    urls = [f'{CAMPUSES[campus]}{dep_file}' for dep_file, _ in plan_catalog(index)]
+    pages = [(CAMPUSES[campus], index)] + list(download_pages(urls))
+    write_bundle(path, pages, {'kind': 'catalog', 'campus': campus})
+    return len(pages)
@@ -0,0 +1,115 @@
+"""Column-by-column accumulation of parsed rows, used to build Arrow record batches without pandas"""
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def require_arrow():
+    """ Raises an ImportError if pyarrow, needed for struct='arrow', is not installed """
+    if pa is None:
+        raise ImportError('struct="arrow" requires pyarrow, install it with "pip install pyarrow"')
+
+
+class Columns:
+    """
+    Accumulates parsed rows as one Python list per column
+
+    @params
+
+        'names': The column names, in the order values appear in each row
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.columns = {name: [] for name in self.names}
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def extend(self, rows):
+        """
+        Adds rows to the columns. Rows shorter than the number of columns are padded with None.
+
+        @params
+
+            'rows': An iterable of lists/tuples
+        """
+        columns = [self.columns[name] for name in self.names]
+        for row in rows:
+            width = len(row)
+            for i, column in enumerate(columns):
+                column.append(row[i] if i < width else None)
+
+    def fill(self, name, value, start=0):
+        """
+        Sets the column 'name' to 'value' for every row from 'start' on, adding the column if needed
+
+        @params
+
+            'name': The column name
+
+            'value': The value for every row
+
+            'start': Index of the first row to set
+        """
+        if name not in self.columns:
+            self.names.append(name)
+            self.columns[name] = [None] * len(self)
+        column = self.columns[name]
+        column[start:] = [value] * (len(column) - start)
+
+    def add(self, name, values):
+        """ Adds the column 'name' with the given values """
+        self.names.append(name)
+        self.columns[name] = list(values)
+
+    def to_arrow(self, order=None, types=None, plain=()):
+        """
+        Builds an Arrow record batch from the columns. String columns are dictionary encoded
+        since most of their values repeat.
+
+        @params
+
+            'order': The column names to include, in order. Defaults to every column.
+
+            'types': Dictionary of column name -> Arrow type for non-string columns
+
+            'plain': Names of string columns that are mostly unique and are not dictionary encoded
+
+        Returns
+
+            A pyarrow RecordBatch
+        """
+        require_arrow()
+        types = types or {}
+        order = order or self.names
+        arrays = []
+        for name in order:
+            if name in types:
+                arrays.append(pa.array(self.columns[name], type=types[name]))
+            else:
+                array = pa.array(self.columns[name], type=pa.string())
+                arrays.append(array if name in plain else array.dictionary_encode())
+        return pa.RecordBatch.from_arrays(arrays, names=list(order))
+
+
+def to_table(batches, schema=None):
+    """
+    Combines record batches with the same columns into one Arrow table
+
+    @params
+
+        'batches': A list of pyarrow RecordBatches
+
+        'schema': Schema of the table, required if 'batches' is empty
+
+    Returns
+
+        A pyarrow Table
+    """
+    require_arrow()
+    batches = [b for b in batches if b is not None]
+    # Each batch has its own dictionaries, unify them so the table shares one per column
+    return pa.Table.from_batches(batches, schema=schema).unify_dictionaries()
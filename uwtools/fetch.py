@@ -0,0 +1,234 @@
+"""Shared HTTP layer used by every uwtools parser"""
+
+import time, threading, requests
+import concurrent.futures as cf
+from collections import deque
+
+# Seconds to wait for a connection and for the response of every request
+TIMEOUT = (5, 30)
+# Number of times a failed request (error, timeout or 5xx/429 response) is retried
+RETRIES = 2
+# Seconds to wait before the first retry, doubled for every further retry
+BACKOFF = 0.5
+# Requests still pending past this percentile of recent request latencies get a duplicate
+# (hedged) request, whichever finishes first is used. None disables hedging.
+HEDGE_PERCENTILE = 95
+# Number of latencies needed before requests are hedged
+HEDGE_MIN_SAMPLES = 20
+
+latencies = deque(maxlen=500)
+latencies_lock = threading.Lock()
+hedge_executor = cf.ThreadPoolExecutor(max_workers=32)
+
+# Downloads currently in progress, keyed by url. Each value is a Future that
+# every caller asking for the same url waits on.
+in_flight = {}
+in_flight_lock = threading.Lock()
+
+
+def configure(timeout=None, retries=None, backoff=None, hedge_percentile=False):
+    """
+    Changes how pages are downloaded. Parameters that are not given are left unchanged.
+
+    @params
+
+        'timeout': Seconds to wait for each request, either one number or a
+                   (connect, read) tuple
+
+        'retries': Number of times a failed request is retried
+
+        'backoff': Seconds to wait before the first retry, doubled for every further retry
+
+        'hedge_percentile': Requests still pending past this percentile (0-100) of recent
+                            request latencies are hedged with a duplicate request.
+                            None disables hedging.
+    """
+    global TIMEOUT, RETRIES, BACKOFF, HEDGE_PERCENTILE
+    if timeout is not None:
+        TIMEOUT = timeout
+    if retries is not None:
+        assert retries >= 0, '"retries" must be >= 0'
+        RETRIES = retries
+    if backoff is not None:
+        BACKOFF = backoff
+    if hedge_percentile is not False:
+        assert hedge_percentile is None or 0 < hedge_percentile < 100, \
+            '"hedge_percentile" must be between 0 and 100'
+        HEDGE_PERCENTILE = hedge_percentile
+
+
+def timed_get(url, started=None):
+    """
+    Downloads the given url and records how long the request took. 'started' is an
+    optional Event that is set once the request is sent.
+    """
+    if started is not None:
+        started.set()
+    start = time.perf_counter()
+    response = requests.get(url, timeout=TIMEOUT)
+    with latencies_lock:
+        latencies.append(time.perf_counter() - start)
+    return response
+
+
+def hedge_delay():
+    """
+    Returns
+
+        Seconds after which a pending request is hedged, or None if requests are not hedged
+    """
+    if HEDGE_PERCENTILE is None:
+        return None
+    with latencies_lock:
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+
+
+def hedged_get(url):
+    """
+    Downloads the given url. If the request takes longer than 'hedge_delay', a second
+    identical request is sent and the response of whichever succeeds first is returned.
+    The delay is counted from when the first request is sent, so requests still waiting
+    for a worker of 'hedge_executor' are never hedged.
+    """
+    delay = hedge_delay()
+    if delay is None:
+        return timed_get(url)
+    started = threading.Event()
+    pending = {hedge_executor.submit(timed_get, url, started)}
+    started.wait()
+    done, pending = cf.wait(pending, timeout=delay)
+    if not done:
+        pending.add(hedge_executor.submit(timed_get, url))
+    while True:
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            # Every request failed, raise the error of the last one
+            return future.result()
+        done, pending = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+
+
+def download(url):
+    """ Downloads the given url, retrying failed requests with exponential backoff """
+    for attempt in range(RETRIES + 1):
+        try:
+            response = hedged_get(url)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == RETRIES:
+                raise
+        else:
+            if (response.status_code < 500 and response.status_code != 429) or attempt == RETRIES:
+                return response
+        time.sleep(BACKOFF * 2 ** attempt)
+
+
+def get(url):
+    """
+    Downloads the given url. Concurrent requests for the same url are coalesced
+    into a single download whose response is shared by every caller.
+
+    Every request times out after TIMEOUT seconds, failed requests are retried up to
+    RETRIES times and slow requests are hedged, see 'configure'.
+
+    @params
+
+        'url': The website to download
+
+    Returns
+
+        The requests Response object for the given url
+    """
+    with in_flight_lock:
+        pending = in_flight.get(url)
+        leader = pending is None
+        if leader:
+            pending = in_flight[url] = cf.Future()
+    if not leader:
+        return pending.result()
+
+    try:
+        response = download(url)
+    except BaseException as e:
+        pending.set_exception(e)
+        raise
+    else:
+        pending.set_result(response)
+        return response
+    finally:
+        # Only requests that overlap share a download, later callers fetch again
+        with in_flight_lock:
+            del in_flight[url]
+
+
+def probe(url):
+    """
+    Checks whether a page exists without downloading its body. Failed requests are
+    retried like those of 'get'.
+
+    @params
+
+        'url': The website to check
+
+    Returns
+
+        True if the url answers with a successful status code, False otherwise
+    """
+    for attempt in range(RETRIES + 1):
+        try:
+            response = requests.head(url, timeout=TIMEOUT, allow_redirects=True)
+            if response.status_code == 405:
+                # Servers not answering HEAD requests get a GET whose body is never read
+                response = requests.get(url, timeout=TIMEOUT, stream=True)
+                response.close()
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == RETRIES:
+                raise
+        else:
+            if (response.status_code < 500 and response.status_code != 429) or attempt == RETRIES:
+                return response.ok
+        time.sleep(BACKOFF * 2 ** attempt)
+
+
+def check(response):
+    """
+    Raises an HTTPError for error responses (4xx/5xx), so that error pages are never
+    parsed as empty ones. Works for Responses and for pages read from a Bundle.
+
+    @params
+
+        'response': The response of 'get' or 'Bundle.get'
+
+    Returns
+
+        The given response
+    """
+    if not response.ok:
+        raise requests.HTTPError(f'{response.status_code} Error for url: {response.url}', response=response)
+    return response
+
+
+def failure(campus, department, link, error):
+    """
+    Creates the manifest entry of a page that could not be downloaded or parsed,
+    returned by the parsers when 'partial_ok' is True
+
+    @params
+
+        'campus': The campus of the page
+
+        'department': The department of the page, None for a campus index page
+
+        'link': The url of the page
+
+        'error': The exception that was raised
+
+    Returns
+
+        A dictionary with the 'Campus', 'Department', 'Link' and 'Error' of the failure
+    """
+    return {'Campus': campus, 'Department': department, 'Link': link,
+            'Error': f'{type(error).__name__}: {error}'}
@@ -0,0 +1,257 @@
+"""
+Versioned history of the UW Course Catalogs. Every distinct field value (description,
+prerequisites, credits, ...) and every distinct course row is stored once, addressed by
+its hash, so a snapshot of the catalog only stores one row hash per course.
+
+Layout of the store directory:
+
+    packs/<snapshot>.file       Values and rows first seen in that snapshot
+    snapshots/<snapshot>.file   The Campus, Course ID and row hash of every course
+"""
+
+import os, json, time, hashlib, tempfile
+from zlib import compress, decompress
+import pandas as pd
+from .parse_schedules import course_key
+
+# Columns of the diff and history results
+DIFF_COLUMNS = ['Campus', 'Course ID', 'Change', 'Field', 'Before', 'After']
+HISTORY_COLUMNS = ['Snapshot', 'Campus', 'Course ID', 'Change', 'Field', 'Value']
+
+
+def content_hash(value):
+    """
+    Returns
+
+        The address of a JSON serializable value in the store
+    """
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def read_file(path):
+    with open(path, mode='rb') as f:
+        return json.loads(decompress(f.read()))
+
+
+def write_file(path, data):
+    # Write to a temporary file first so readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, mode='wb') as f:
+        f.write(compress(json.dumps(data).encode()))
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+class CatalogHistory:
+    """
+    Content addressed store of course catalog snapshots
+
+    @params
+
+        'path': The store directory, created if needed
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.join(path, 'packs'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'snapshots'), exist_ok=True)
+        self.values = None
+        self.rows = None
+        self.cache = {}
+
+    def _file(self, kind, name):
+        return os.path.join(self.path, kind, f'{name}.file')
+
+    def load_packs(self):
+        """ Reads every value and row of the store into memory, once """
+        if self.values is None:
+            self.values, self.rows = {}, {}
+            for name in os.listdir(os.path.join(self.path, 'packs')):
+                if name.endswith('.file'):
+                    pack = read_file(os.path.join(self.path, 'packs', name))
+                    self.values.update(pack['values'])
+                    self.rows.update(pack['rows'])
+
+    def snapshot(self, name):
+        """
+        Returns
+
+            The stored snapshot: a dictionary with its 'Name', 'Created' time, 'Keys'
+            ([Campus, Course ID] of every course) and 'Rows' (row hash of every course)
+        """
+        if name not in self.cache:
+            if not os.path.exists(self._file('snapshots', name)):
+                raise KeyError(f'There is no snapshot named {name}')
+            self.cache[name] = read_file(self._file('snapshots', name))
+        return self.cache[name]
+
+    def snapshots(self):
+        """
+        Returns
+
+            The names of the stored snapshots, oldest first
+        """
+        names = [n[:-len('.file')] for n in os.listdir(os.path.join(self.path, 'snapshots'))
+                 if n.endswith('.file')]
+        return sorted(names, key=lambda n: (self.snapshot(n)['Created'], n))
+
+    def add(self, catalog, name=None):
+        """
+        Stores a snapshot of a course catalog. Only values and rows not yet in the store
+        are written.
+
+        @params
+
+            'catalog': Output of 'course_catalogs' as a DataFrame (struct='df') or
+                       dictionary (struct='dict')
+
+            'name': Name of the snapshot, defaults to the current date (i.e. '2024-09-30').
+                    Later snapshots of the same day are numbered (i.e. '2024-09-30-2').
+
+        Returns
+
+            The name of the snapshot
+        """
+        if not isinstance(catalog, pd.DataFrame):
+            catalog = pd.DataFrame.from_dict(catalog, orient='index')
+        if not name:
+            date = name = time.strftime('%Y-%m-%d')
+            count = 1
+            while os.path.exists(self._file('snapshots', name)):
+                count += 1
+                name = f'{date}-{count}'
+        assert not os.path.exists(self._file('snapshots', name)), f'The snapshot {name} already exists'
+        self.load_packs()
+
+        new_values, new_rows = {}, {}
+        keys, rows = [], []
+        fields = [c for c in catalog.columns]
+        for course_id, record in zip(catalog.index, catalog.to_dict(orient='records')):
+            row = {}
+            for field in fields:
+                value = record[field]
+                if value != value:
+                    # NaN
+                    value = None
+                address = content_hash(value)
+                if address not in self.values and address not in new_values:
+                    new_values[address] = value
+                row[field] = address
+            address = content_hash(row)
+            if address not in self.rows and address not in new_rows:
+                new_rows[address] = row
+            keys.append([record.get('Campus'), course_id])
+            rows.append(address)
+
+        # The pack is written before the snapshot, so a snapshot never refers to missing rows
+        write_file(self._file('packs', name), {'values': new_values, 'rows': new_rows})
+        self.values.update(new_values)
+        self.rows.update(new_rows)
+        write_file(self._file('snapshots', name), {'Name': name, 'Created': time.time(),
+                                                   'Keys': keys, 'Rows': rows})
+        return name
+
+    def get(self, name, struct='df'):
+        """
+        Rebuilds a stored catalog
+
+        @params
+
+            'name': The snapshot name
+
+            'struct': 'df' -> Pandas DataFrame
+                      'dict' -> Python Dictionary
+
+        Returns
+
+            The catalog in the layout of 'course_catalogs'
+        """
+        assert struct in ['df', 'dict'], f'{struct} is not a valid argument for "struct"'
+        self.load_packs()
+        snapshot = self.snapshot(name)
+        records = []
+        for address in snapshot['Rows']:
+            records.append({field: self.values[value] for field, value in self.rows[address].items()})
+        catalog = pd.DataFrame(records, index=pd.Index([k[1] for k in snapshot['Keys']], name='Course ID'))
+        return catalog.to_dict(orient='index') if struct == 'dict' else catalog
+
+    def diff(self, before, after, fields=None):
+        """
+        Finds what changed between two snapshots
+
+        @params
+
+            'before', 'after': The snapshot names
+
+            'fields': Optional list of fields to compare, defaults to every field
+
+        Returns
+
+            A DataFrame with one row per change: the 'Campus' and 'Course ID' of the
+            course, the 'Change' ('added', 'removed' or 'changed'), and for changed
+            courses the 'Field' with its value 'Before' and 'After'
+        """
+        self.load_packs()
+        old, new = self.snapshot(before), self.snapshot(after)
+        old_rows = dict(zip(map(tuple, old['Keys']), old['Rows']))
+        new_rows = dict(zip(map(tuple, new['Keys']), new['Rows']))
+
+        changes = []
+        for key, address in new_rows.items():
+            previous = old_rows.get(key)
+            if previous is None:
+                changes.append([*key, 'added', None, None, None])
+            elif previous != address:
+                # Only rows whose hash differs are compared field by field
+                for field, before_value, after_value in self.changed_fields(previous, address, fields):
+                    changes.append([*key, 'changed', field, before_value, after_value])
+        for key in old_rows.keys() - new_rows.keys():
+            changes.append([*key, 'removed', None, None, None])
+        changes.sort(key=lambda c: (str(c[0]), str(c[1]), c[2], str(c[3])))
+        return pd.DataFrame(changes, columns=DIFF_COLUMNS)
+
+    def changed_fields(self, before, after, fields=None):
+        old, new = self.rows[before], self.rows[after]
+        for field in (fields or sorted(old.keys() | new.keys())):
+            if old.get(field) != new.get(field):
+                yield (field, self.values.get(old.get(field)), self.values.get(new.get(field)))
+
+    def history(self, course, campus=None, fields=None):
+        """
+        Lists how a course changed across the snapshots
+
+        @params
+
+            'course': The Course ID, i.e. 'CSE142', 'CSE 142' or 'cse142'
+
+            'campus': If given, only the course of this campus is followed
+
+            'fields': Optional list of fields to follow, defaults to every field
+
+        Returns
+
+            A DataFrame with one row per change: the 'Snapshot' it was first seen in,
+            the 'Campus' and 'Course ID', the 'Change' ('added', 'changed' or 'removed')
+            and the 'Field' with its new 'Value'. The first snapshot listing the course
+            has one 'added' row per field.
+        """
+        self.load_packs()
+        course = course_key(course)
+        changes = []
+        previous = {}
+        for name in self.snapshots():
+            snapshot = self.snapshot(name)
+            current = {tuple(key): address for key, address in zip(snapshot['Keys'], snapshot['Rows'])
+                       if course_key(key[1]) == course and (campus is None or key[0] == campus)}
+            for key, address in current.items():
+                if key not in previous:
+                    row = self.rows[address]
+                    for field in (fields or list(row)):
+                        changes.append([name, *key, 'added', field, self.values.get(row.get(field))])
+                elif previous[key] != address:
+                    for field, _, value in self.changed_fields(previous[key], address, fields):
+                        changes.append([name, *key, 'changed', field, value])
+            for key in previous.keys() - current.keys():
+                changes.append([name, *key, 'removed', None, None])
+            previous = current
+        return pd.DataFrame(changes, columns=HISTORY_COLUMNS)
@@ -0,0 +1,77 @@
+"""
+Persistent memo of parsed department pages. Parsed rows are stored on disk keyed by the
+content hash of the page they were parsed from, so unchanged pages are never parsed twice.
+"""
+
+import os, json, hashlib, tempfile
+from zlib import compress, decompress
+
+# Directory the memo is stored in, can be changed through the UWTOOLS_CACHE environment variable
+MEMO_DIR = os.environ.get('UWTOOLS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'uwtools'))
+
+
+def content_key(source, *context):
+    """
+    Hashes a page source together with the context it is parsed in
+
+    @params
+
+        'source': The page source
+
+        'context': Any values that also change the parsed result, i.e. the parser
+                   version or the campus
+
+    Returns
+
+        The hex digest identifying the parsed result of 'source'
+    """
+    digest = hashlib.sha1('\x1f'.join(map(str, context)).encode())
+    digest.update(b'\x1e')
+    digest.update(source.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def memo_path(key):
+    return os.path.join(MEMO_DIR, 'memo', key[:2], f'{key}.file')
+
+
+def load(key):
+    """
+    Loads the parsed rows stored for the given key
+
+    @params
+
+        'key': The key returned by 'content_key'
+
+    Returns
+
+        The stored rows, or None if nothing is stored for 'key'
+    """
+    try:
+        with open(memo_path(key), mode='rb') as f:
+            return json.loads(decompress(f.read()))
+    except (OSError, ValueError):
+        return None
+
+
+def store(key, rows):
+    """
+    Stores the parsed rows for the given key. Failing to write the memo is not an
+    error, the rows are simply parsed again next time.
+
+    @params
+
+        'key': The key returned by 'content_key'
+
+        'rows': JSON serializable parsed rows
+    """
+    path = memo_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, mode='wb') as f:
+            f.write(compress(json.dumps(rows).encode()))
+        os.replace(tmp, path)
+    except OSError:
+        pass
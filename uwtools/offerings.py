@@ -0,0 +1,196 @@
+"""
+Joins the UW Course Catalogs onto the sections of the Time Schedules. Course names of both
+are normalized into one key (i.e. 'E E 235', 'EE 235' and 'EE235' -> 'EE235') and catalog
+metadata is looked up through a hash index instead of merging DataFrames.
+"""
+
+import time, threading
+import pandas as pd
+from collections import OrderedDict
+from .parse_courses import parse_catalogs, CATALOG_PARSER_VERSION
+from .parse_schedules import gather, course_key, SCHEDULE_KEYS, SCHEDULE_PARSER_VERSION
+
+# Catalog columns added to each section. The catalog 'Course Name' is renamed to
+# 'Course Title' since the Time Schedules have a 'Course Name' column as well.
+CATALOG_COLUMNS = {'Course Name': 'Course Title', 'College': 'College', 'Credits': 'Credits',
+                   'Areas of Knowledge': 'Areas of Knowledge', 'Quarters Offered': 'Quarters Offered',
+                   'Prerequisites': 'Prerequisites', 'Co-Requisites': 'Co-Requisites'}
+
+# Number of joined results kept in memory
+CACHE_SIZE = 8
+# Seconds after which results joined from parsed (instead of given) data are parsed again
+CACHE_TTL = 900
+
+cache = OrderedDict()
+indexes = OrderedDict()
+cache_lock = threading.Lock()
+
+
+def remember(store, key, value, ttl=None):
+    # Values without a 'ttl' are kept until they are evicted
+    expires = None if ttl is None else time.monotonic() + ttl
+    with cache_lock:
+        store[key] = (expires, value)
+        store.move_to_end(key)
+        while len(store) > CACHE_SIZE:
+            store.popitem(last=False)
+
+
+def recall(store, key):
+    with cache_lock:
+        entry = store.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del store[key]
+            return None
+        store.move_to_end(key)
+        return entry[1]
+
+
+def catalog_index(catalog):
+    """
+    Builds the hash index of a course catalog
+
+    @params
+
+        'catalog': Output of 'course_catalogs' (struct='df')
+
+    Returns
+
+        A dictionary of (campus, course key) -> row position, with course key -> row
+        position of the first campus listing the course as well
+    """
+    index = {}
+    for position, (course_id, campus) in enumerate(zip(catalog.index, catalog['Campus'])):
+        key = course_key(course_id)
+        index.setdefault((campus, key), position)
+        index.setdefault(key, position)
+    return index
+
+
+def join(schedules, catalog, index):
+    """
+    Adds the catalog metadata of each section to the Time Schedules
+
+    @params
+
+        'schedules': Output of 'time_schedules' (struct='df'), None or an empty
+                     DataFrame if no sections are available
+
+        'catalog': Output of 'course_catalogs' (struct='df')
+
+        'index': The 'catalog_index' of the catalog
+
+    Returns
+
+        A copy of 'schedules' with the 'Course ID' and CATALOG_COLUMNS columns. Without
+        sections, every catalog course is returned once with empty Time Schedule columns.
+    """
+    metadata = catalog[list(CATALOG_COLUMNS)].rename(columns=CATALOG_COLUMNS)
+    metadata.insert(0, 'Course ID', catalog.index)
+    metadata = metadata.reset_index(drop=True)
+
+    if schedules is None or schedules.empty:
+        # i.e. a quarter whose Time Schedules are not published yet
+        columns = SCHEDULE_KEYS if schedules is None or schedules.columns.empty else list(schedules.columns)
+        offerings = pd.DataFrame(index=metadata.index, columns=columns)
+        offerings['Campus'] = catalog['Campus'].values
+        offerings.index.name = 'Index'
+        for column in metadata.columns:
+            offerings[column] = metadata[column]
+        return offerings
+
+    names = schedules['Course Name']
+    # Course names repeat for every section, each distinct name is only normalized once
+    keys = {name: course_key(name) for name in names.unique()}
+    positions = [index.get((campus, keys[name]), index.get(keys[name], -1))
+                 for campus, name in zip(schedules['Campus'], names)]
+
+    # Sections without a catalog entry have the -1 position, which reindexes to an empty row
+    metadata = metadata.reindex(positions)
+    metadata.index = schedules.index
+
+    offerings = schedules.copy()
+    for column in metadata.columns:
+        offerings[column] = metadata[column]
+    return offerings
+
+
+def course_offerings(year, quarter, campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
+                     catalog=None, schedules=None, use_cache=True, catalog_key=None, schedules_key=None):
+    """
+    Time Schedule sections joined with the course catalog information of their course
+
+    @params
+
+        'year': The year to get time schedules from
+
+        'quarter': The specific quarter to get time schedules from
+
+        'campuses': The Campuses to get the Time Schedules and course catalogs from
+
+        'struct': 'df' -> Pandas DataFrame
+                  'dict' -> Python Dictionary
+
+        'catalog': Optional output of 'course_catalogs' (struct='df') to use instead of
+                   parsing the course catalogs of 'campuses'
+
+        'schedules': Optional output of 'time_schedules' (struct='df') to use instead of
+                     parsing the Time Schedules of 'campuses'
+
+        'use_cache': If True, the result is kept in memory and looked up before anything is
+                     parsed, so repeated calls neither parse nor join again. Results of parsed
+                     data are kept for CACHE_TTL seconds. Also passed on to the parsers.
+
+        'catalog_key', 'schedules_key': Keys identifying the snapshots given as 'catalog'
+                                        and 'schedules' (i.e. a CatalogHistory snapshot
+                                        name). Results of given data are only cached when
+                                        their key is given.
+
+    Returns
+
+        The Time Schedules with the 'Course ID' of each section and its 'Course Title',
+        'College', 'Credits', 'Areas of Knowledge', 'Quarters Offered', 'Prerequisites'
+        and 'Co-Requisites' from the course catalog. Sections are matched to the catalog
+        of their own campus first, then to any campus listing the course. Sections
+        without a catalog entry have empty catalog columns. If the quarter has no sections,
+        the catalog courses are returned with empty Time Schedule columns.
+    """
+    assert type(struct) == str, 'Type of "struct" must be str'
+    assert struct in ['df', 'dict'], f'{struct} is not a valid argument for "struct"'
+    assert type(use_cache) == bool, 'Type of "use_cache" must be bool'
+
+    names = tuple(sorted(c.title() for c in campuses))
+    # The cache is checked with keys built from the arguments only, before any parsing
+    parsed_catalog = catalog is None
+    if parsed_catalog:
+        catalog_key = ('catalog', names, CATALOG_PARSER_VERSION)
+    if schedules is None:
+        schedules_key = ('schedules', names, int(year), quarter, SCHEDULE_PARSER_VERSION)
+    cacheable = use_cache and catalog_key is not None and schedules_key is not None
+    # Results of parsed data expire, those of given snapshots stay valid until evicted
+    ttl = CACHE_TTL if parsed_catalog or schedules is None else None
+    key = (catalog_key, schedules_key)
+    offerings = recall(cache, key) if cacheable else None
+
+    if offerings is None:
+        if parsed_catalog:
+            catalog = parse_catalogs(list(names), use_cache=use_cache)
+        if schedules is None:
+            schedules = gather(year, quarter, campuses, use_cache=use_cache)
+        index = recall(indexes, catalog_key) if use_cache and catalog_key is not None else None
+        if index is None:
+            index = catalog_index(catalog)
+            if use_cache and catalog_key is not None:
+                remember(indexes, catalog_key, index, CACHE_TTL if parsed_catalog else None)
+        offerings = join(schedules, catalog, index)
+        if cacheable:
+            remember(cache, key, offerings, ttl)
+
+    if struct == 'dict':
+        # Missing catalog values are None instead of NaN so the records stay valid JSON
+        offerings = offerings.astype(object).where(offerings.notna(), None)
+        return offerings.to_dict(orient='records')
+    # Copy so changes made by the caller do not alter the cached result
+    return offerings.copy()
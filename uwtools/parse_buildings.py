@@ -1,10 +1,12 @@
 """Parses UW's Facilities Websites to get all Building Names"""
 
-import re, json, os, requests
+import re, json, os
 from bs4 import BeautifulSoup
 from zlib import decompress
 from pkgutil import get_data
 import concurrent.futures as cf
+from functools import lru_cache
+from . import fetch
 
 dorm_site_re = re.compile(r'\([A-Z]{3,}\)\s?((\</div\>)|(\s?\| Campus Maps))')
 dorm_abb_re = re.compile(r'\([A-Z]{3,}\)')
@@ -22,12 +24,12 @@ def seattle():
         local_dorm_abb_re = dorm_abb_re
         names = []
         # Get UW Seattle Dorm Building Abbreviations and Names
-        uw_dorms = BeautifulSoup(requests.get('https://hfs.uw.edu/Live/Undergraduate-Residence-Halls-and-Apartments').text, 
+        uw_dorms = BeautifulSoup(fetch.get('https://hfs.uw.edu/Live/Undergraduate-Residence-Halls-and-Apartments').text, 
                             features='lxml')
         for img in uw_dorms.find_all('img'):
             dorm_name = str(img).rsplit('alt="', 1)[-1].split('"', 1)[0]
             if 'Hall' in dorm_name:
-                dorm_site = BeautifulSoup(requests.get(f'https://www.google.dz/search?q=http://www.washington.edu/maps UW {dorm_name}').text, 
+                dorm_site = BeautifulSoup(fetch.get(f'https://www.google.dz/search?q=http://www.washington.edu/maps UW {dorm_name}').text, 
                                         features='lxml').find('html')
                 match = re.search(local_dorm_site_re, str(dorm_site))
                 if match:
@@ -38,7 +40,7 @@ def seattle():
     def classrooms():
         # Get UW Seattle Classroom Building Abbreviations and Names
         names = []
-        uw_classrooms = BeautifulSoup(requests.get('https://www.washington.edu/classroom/').text, 
+        uw_classrooms = BeautifulSoup(fetch.get('https://www.washington.edu/classroom/').text, 
                                     features='lxml')
         uw_classrooms = uw_classrooms.find("div", {"id": "buildings"})
         for link in uw_classrooms.find_all('a'):
@@ -49,7 +51,7 @@ def seattle():
     def buildings():
         # Supplement previous UW Building scrape with additional data
         names = []
-        buildings = BeautifulSoup(requests.get('https://www.washington.edu/students/reg/buildings.html').text,
+        buildings = BeautifulSoup(fetch.get('https://www.washington.edu/students/reg/buildings.html').text,
                                 features='lxml')
         buildings = str(buildings.html).split('<h2>Code - Building Name (Map Grid)</h2>', 1)[-1]
         buildings = BeautifulSoup(buildings.rsplit('<div class="uw-footer">', 1)[0], features='lxml')
@@ -82,7 +84,7 @@ def bothell():
         Dictionary with Building Name Abbreviations to full Building Names
     """
     buildings = {}
-    bothell_buildings = BeautifulSoup(requests.get('https://www.uwb.edu/safety/hours').text, features='lxml')
+    bothell_buildings = BeautifulSoup(fetch.get('https://www.uwb.edu/safety/hours').text, features='lxml')
     for building in bothell_buildings.find_all('div', {'class': ['col1', 'col2', 'col3']}):
         bld = str(building.find('h3'))
         if bld and '(' in bld:
@@ -103,7 +105,7 @@ def tacoma():
     """
     buildings = {}
     local_building_re = building_re
-    tacoma_buildings = BeautifulSoup(requests.get('https://www.tacoma.uw.edu/campus-map/buildings').text, 
+    tacoma_buildings = BeautifulSoup(fetch.get('https://www.tacoma.uw.edu/campus-map/buildings').text, 
                                 features='lxml')
     for building in tacoma_buildings.find('div', class_='field-items').find('ul').find_all('a'):
         text = building.text
@@ -112,7 +114,7 @@ def tacoma():
             name = text.rsplit('(', 1)[0].strip()
             buildings[abbreviation] = name
         else:
-            link = BeautifulSoup(requests.get('https://www.tacoma.uw.edu{}'.format(str(building.get('href')))).text,
+            link = BeautifulSoup(fetch.get('https://www.tacoma.uw.edu{}'.format(str(building.get('href')))).text,
                                             features='lxml')
             for table in link.find_all('table'):
                 for l in table.find_all('a'):
@@ -146,6 +148,55 @@ def get_buildings(campuses=['Seattle', 'Bothell', 'Tacoma']):
     return buildings
 
 
+@lru_cache(maxsize=None)
+def load_coordinates():
+    """
+    Loads the packaged building coordinates once per process
+
+    Returns
+
+        A dictionary of Campus -> Building Abbreviation -> {'Latitude', 'Longitude', 'Name'}
+    """
+    return json.loads(decompress(get_data(__package__, 'Coordinates.file')))
+
+
+@lru_cache(maxsize=None)
+def coordinate_table():
+    """
+    Returns
+
+        A dictionary of (Campus, Building Abbreviation) -> (Latitude, Longitude) as floats
+    """
+    return {(campus, building): (float(coords['Latitude']), float(coords['Longitude']))
+            for campus, buildings in load_coordinates().items()
+            for building, coords in buildings.items()
+            # Some buildings are listed without coordinates
+            if coords['Latitude'] and coords['Longitude']}
+
+
+def lookup_coordinates(campuses, buildings):
+    """
+    Finds the coordinates of each building with one hash lookup per row
+
+    @params
+
+        'campuses': The campus of each row
+
+        'buildings': The building abbreviation of each row
+
+    Returns
+
+        Lists of the latitudes and longitudes (None if a building is not found) and a sorted
+        list of the (Campus, Building) pairs that were not found
+    """
+    table = coordinate_table()
+    missing = (None, None)
+    coordinates = [table.get(key, missing) for key in zip(campuses, buildings)]
+    unmatched = sorted({key for key, coords in zip(zip(campuses, buildings), coordinates)
+                        if coords is missing and key[1]})
+    return [c[0] for c in coordinates], [c[1] for c in coordinates], unmatched
+
+
 def geocode(buildings=[], campuses=['Seattle', 'Bothell', 'Tacoma']):
     """
     Geocodes UW Buildings
@@ -161,11 +212,11 @@ def geocode(buildings=[], campuses=['Seattle', 'Bothell', 'Tacoma']):
         A dictionary with data for each building in the buildings list
     """
     assert all([c in ['Seattle', 'Bothell', 'Tacoma'] for c in list(map(str.title, campuses))])
-    coordinates = json.loads(decompress(get_data(__package__, 'Coordinates.file')))
+    buildings = set(buildings)
     all_campuses = {}
-    for campus, buildings_ in coordinates.items():
+    for campus, buildings_ in load_coordinates().items():
         if campus.title() in campuses:
             for building, coords in buildings_.items():
-                if building in buildings or not buildings:
-                    all_campuses[building] = coords
-    return all_campuses
\ No newline at end of file
+                if not buildings or building in buildings:
+                    all_campuses[building] = dict(coords)
+    return all_campuses
@@ -1,11 +1,15 @@
 """ Creates a tsv file containing course data for each UW Campus """
 
-import re, time, json, os, requests
+import re, time, json, os
+from collections import namedtuple
 import pandas as pd
 import concurrent.futures as cf
 from tqdm import tqdm
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from unicodedata import normalize
+from . import fetch, memo
+from .bundle import open_bundles, close_bundles
+from .columnar import Columns, pa, require_arrow, to_table
 
 CAMPUSES = {   
     'Seattle': 'http://www.washington.edu/students/crscat/',                                                                             
@@ -13,10 +17,21 @@ CAMPUSES = {
     'Tacoma': 'http://www.washington.edu/students/crscatt/'                                 
 }                                                                                           
 
+# Bump when a change to the parser changes its output, invalidating memoized pages
+CATALOG_PARSER_VERSION = 1
+DEPARTMENTS_PARSER_VERSION = 2
+
 COLUMN_NAMES = ['Campus', 'Department Name', 'Course Number', 'Course Name', 'Credits',
                 'Areas of Knowledge', 'Quarters Offered', 'Offered with', 
                 'Prerequisites', 'Co-Requisites', 'Description']
 
+# Columns of the course catalogs, in order, after the 'Course ID'
+CATALOG_KEYS = ['Campus', 'Department Name', 'College'] + COLUMN_NAMES[2:]
+
+# Course record of struct='tuples', with the CATALOG_KEYS as lowercase field names
+CatalogCourse = namedtuple('CatalogCourse', ['course_id'] + [
+    re.sub(r'\W+', '_', key).lower() for key in CATALOG_KEYS])
+
 
 def check_campus(department_name, department_dict, val):
     """
@@ -237,14 +252,230 @@ def get_offered(description):
     return ','.join(result)        
 
 
+def campus_departments(source, use_cache=True):
+    """
+    Parses the departments in each college from a campus course catalog index page
+
+    @params
+
+        'source': The page source of the campus course catalog index page
+
+        'use_cache': If True, the result is looked up in (and stored to) the memo keyed by
+                     the page content
+
+    Returns
+
+        A dictionary of College -> Department Abbreviation -> Department Full Name
+    """
+    if not use_cache:
+        return parse_departments_page(source)
+    key = memo.content_key(source, 'departments', DEPARTMENTS_PARSER_VERSION)
+    departments = memo.load(key)
+    if departments is None:
+        departments = parse_departments_page(source)
+        memo.store(key, departments)
+    return departments
+
+
+# Only the college headings and department links of the index page are parsed
+index_strainer = SoupStrainer(['h2', 'a'])
+college_id_re = re.compile(r'[A-Za-z]+')
+
+def parse_departments_page(source):
+    """
+    Parses a campus course catalog index page in one pass over its college headings and
+    department links, in document order. Every department link belongs to the college
+    heading before it.
+
+    @params
+
+        'source': The page source of the campus course catalog index page
+
+    Returns
+
+        See 'campus_departments'
+    """
+    departments = {}
+    college = None
+    local_normalize = normalize
+    page = BeautifulSoup(source.rsplit('class="col-md-4 uw-sidebar"', 1)[0], features='lxml',
+                         parse_only=index_strainer)
+    for tag in page.find_all(['h2', 'a']):
+        if tag.name == 'h2':
+            # College Names at UW i.e. College of Built Environments, College of Engineering, etc...
+            college_id = tag.get('id')
+            if college_id is not None:
+                # Headings whose id does not name a college end the previous college
+                college = None
+                if college_id_re.search(college_id):
+                    college = departments[tag.get_text()] = {}
+            continue
+        if college is None:
+            continue
+        # There are some non-breaking spaces ('\xa0', encoding='ISO-8859-1') which
+        # are removed through the 'normalize' function
+        dep_name = local_normalize('NFKD', tag.get_text())
+        if '(' in dep_name and '--' not in dep_name:
+            full_name, abbrev = dep_name.rsplit('(', 1)
+            abbrev = abbrev.replace(' ', '')[:-1]
+            if not abbrev.startswith('See'):
+                college[abbrev] = full_name.strip()
+    return departments
+
+
+def plan_catalog(source, departments=None):
+    """
+    Builds the list of department pages to parse from a campus course catalog index page
+
+    @params
+
+        'source': The page source of the campus course catalog index page
+
+        'departments': Optional list of department abbreviations (i.e. ['CSE', 'EE']).
+                       If given, only these departments are planned.
+
+    Returns
+
+        A list of (department page, department abbreviation) tuples. In the course catalog
+        website several department links appear multiple times, each page is only listed once.
+    """
+    plan = {}
+    for link in BeautifulSoup(source, features='lxml').find_all('a'):
+        dep_file = link.get('href')
+        # The only links that are used for finding departments are those
+        # of the format [a-z]+.html
+        if not dep_file or '/' in dep_file or not dep_file.endswith('.html'):
+            continue
+        # The abbreviated Department Name i.e EE for Electrical Engineering
+        abbrev = normalize('NFKD', link.text).rsplit('(', 1)[-1].replace(' ', '')[:-1]
+        if (departments is None or abbrev in departments) and dep_file not in plan:
+            plan[dep_file] = abbrev
+    return list(plan.items())
+
+
 course_re = re.compile(r'[A-Z&]+')
 course_name_re = re.compile(r'[^\(]+')
 credits_re = re.compile(r'(I&S)|(DIV)|(NW)|(VLPA)|(QSR)')
 credits_num_re = re.compile(r'\([\*,\[\]\.max\d/ \-]+\)')
 offered_jointly_re = re.compile(r'([A-Z& ]+\d+)')
 
+def parse_department(campus, dep_file, use_cache=True, bundle=None):
+    """
+    Extracts all course information from a UW Department
+
+    @params:
+
+        'campus': The campus the department is in
+
+        'dep_file': The department page (i.e cse.html) in the campus course catalog
+                    to get course information from
+
+        'use_cache': If True, the parsed page is looked up in (and stored to) the memo
+                     keyed by the page content, so unchanged pages are not parsed again
+
+        'bundle': Optional opened snapshot bundle (see 'bundle.open_bundles') the page is
+                  read from instead of being downloaded
+
+    Returns
+
+        A list of lists. Each nested list represents one course section with the
+        following values (in this order):
+
+        'Campus', 'Department Name', 'Course Number', 'Course Name', 'Credits',
+        'Areas of Knowledge', 'Quarters Offered', 'Offered with', 
+        'Prerequisites', 'Co-Requisites', 'Description'
+    """
+    source = fetch.check((fetch if bundle is None else bundle).get(f'{CAMPUSES[campus]}{dep_file}')).text
+    # Unchanged department pages are read from the memo instead of being parsed again
+    if use_cache:
+        key = memo.content_key(source, 'catalog', CATALOG_PARSER_VERSION, campus)
+        courses = memo.load(key)
+        if courses is not None:
+            return courses
+
+    courses = parse_department_page(source, campus)
+    if use_cache:
+        memo.store(key, courses)
+    return courses
+
+
+def parse_department_page(source, campus):
+    """
+    Parses the course catalog page source of a department
+
+    @params
+
+        'source': The page source of the department course catalog website
+
+        'campus': The campus the department is in
+
+    Returns
+
+        The parsed courses, see 'parse_department'
+    """
+    # Regular expressions for searching course descriptions stored in local variables
+    # for better peformance
+    local_course_re = course_re
+    local_course_name_re = course_name_re
+    local_credits_re = credits_re
+    local_credits_num_re = credits_num_re
+    local_offered_jointly_re = offered_jointly_re
+
+    # Method used in extracting data from course descriptions found in the local scope
+    # are stored in local variables for better performance
+    local_complete_description = complete_description
+    local_get_offered = get_offered
+    local_get_requisites = get_requisites
+
+    # All the courses in the department
+    courses = []
+    department = BeautifulSoup(source, features='lxml')
+    for course in department.find_all('a'):
+        course_ID = course.get('name')  
+        if course_ID:
+            course_ID = course_ID.upper()
+            course_title = course.find('b').text
+            # The Course Description
+            description = course.get_text().replace(course_title, '', 1)        
+            instructors = course.find('i')
+            if instructors:
+                description = description.replace(str(instructors.get_text()), '', 1)
+            del instructors
+            course_text = local_complete_description( \
+                            description.rsplit('View course details in MyPlan', 1)[0])
+            # Course Number i.e 351
+            course_number = re.sub(local_course_re, '', course_ID)
+            match_name = re.search(local_course_name_re, course_title)
+            match_credit_num = re.search(local_credits_num_re, course_title)
+            match_credit_types = re.findall(local_credits_re, course_title)
+            # Jointly offered course with the given course
+            if 'jointly with' in course_text:                                                   
+                offered_jointly = course_text.rsplit('jointly with ', 1)[-1].rsplit(';', 1)[0]                                
+                offered_jointly = ','.join(re.findall( \
+                    local_offered_jointly_re, offered_jointly)).replace(' ', '') 
+            else:
+                offered_jointly = ''
+            courses.append(
+                    # Campus, Department Name and Course Number
+                    [campus, course_ID[:-3], course_number, 
+                    # Course Name
+                    match_name.group(0).split(course_number, 1)[-1].strip() \
+                                                if match_name else '',
+                    # Number of credits for the course
+                    match_credit_num.group(0)[1:-1] \
+                                                if match_credit_num else '', 
+                    # Course Credit Types (I&S, DIV, NW, VLPA, QSR, C)
+                    ','.join([list(filter(('').__ne__, x))[0] for x in match_credit_types]) \
+                                                if match_credit_types else '', 
+                    local_get_offered(course_text),
+                    offered_jointly, local_get_requisites(course_text, 'Prerequisite:'), 
+                    local_get_requisites(course_text, 'Co-requisite'), course_text]
+            )
+    return courses
+
+
 def parse_catalogs(campuses=['Seattle', 'Bothell', 'Tacoma'], struct='df', 
-                   show_progress=False):
+                   show_progress=False, use_cache=True, partial_ok=False, bundle=None):
     """
     Parses the UW Course Catalogs for the given campuses
 
@@ -257,15 +488,31 @@ def parse_catalogs(campuses=['Seattle', 'Bothell', 'Tacoma'], struct='df',
 
         'struct': The Data Structure to return the course catalog data in
                   'df' -> Pandas DataFrame
-                  'dict' -> Python Dictionary
+                  'dict' -> Python Dictionary of Course ID -> course, built without pandas
+                  'tuples' -> List of CatalogCourse named tuples, built without pandas
+                  'arrow' -> pyarrow Table with dictionary encoded string columns and
+                             'Course ID' as the first column, built without pandas
+                             (requires pyarrow)
 
         'show_progress': Displays a progress meter in the console if True,
                          otherwise displays nothing
 
+        'use_cache': If True, department pages whose content has not changed since they were
+                     last parsed are read from the memo instead of being parsed again
+
+        'partial_ok': If True, departments (or campuses) whose pages fail to download or parse
+                      are skipped instead of aborting the whole run
+
+        'bundle': A snapshot bundle (or its path, or a list of them) written by
+                  'bundle.snapshot_catalog'. Pages are read from the bundle instead of
+                  being downloaded.
+
     Returns
 
         A Pandas DataFrame/Python Dictionary representing the course catalogs for all UW
         Campuses in the 'campuses' list. 
+        If 'partial_ok' is True, a tuple of the course catalogs and a list of the failed
+        pages, each a dictionary with the 'Campus', 'Department', 'Link' and 'Error'.
     """
     assert type(campuses) == list or type(campuses) == dict, 'Type of "campuses" must be list or dict'
     if type(campuses) == dict:
@@ -277,196 +524,117 @@ def parse_catalogs(campuses=['Seattle', 'Bothell', 'Tacoma'], struct='df',
     assert all([c in ['Seattle', 'Bothell', 'Tacoma'] for c in list(map(str.title, campuses))])
     assert type(struct) == str, 'Type of "struct" must be str'
     assert type(show_progress) == bool, 'Type of "show_progress" must be bool'
-    assert struct in ['df', 'dict'], f'{struct} is an invalid argument for "struct"'
+    assert type(use_cache) == bool, 'Type of "use_cache" must be bool'
+    assert type(partial_ok) == bool, 'Type of "partial_ok" must be bool'
+    assert struct in ['df', 'dict', 'tuples', 'arrow'], f'{struct} is an invalid argument for "struct"'
+    if struct == 'arrow':
+        require_arrow()
+    if bundle is not None:
+        opened = open_bundles(bundle)
+        if opened is not bundle:
+            # Bundles opened from paths are closed once the catalogs are parsed
+            try:
+                return parse_catalogs(campuses, struct, show_progress, use_cache, partial_ok, opened)
+            finally:
+                close_bundles(opened, bundle)
+    get = fetch.get if bundle is None else bundle.get
 
     # Progress bar for Course Schedule Parsing
     if show_progress:
         progress_bar = tqdm()
 
-    def parse_campus(department_data, campus):
+    def parse_campus(department_plan, campus):
         """
         Parses all courses from a UW Campus
 
         @params
 
-            'department_data': BeautifulSoup object with the department list website source
-                               for the given 'campus'
+            'department_plan': The list of (department page, abbreviation) pairs to parse
+                               for the given 'campus', as returned by 'plan_catalog'
 
             'campus': The campus to get courses from
 
         Returns
 
-            A pandas DataFrame with all courses in the given campus
+            A list of lists with all courses in the given campus, see 'extract_data'
         """
 
-        def extract_data(department_link):
-            """
-            Extracts all course information from a UW Department
-
-            @params:
-
-                'department_link': The url to the UW Department to get course
-                                   information from
-
-            Returns
-
-                A list of lists. Each nested list represents one course section with the
-                following values (in this order):
-
-                'Campus', 'Department Name', 'Course Number', 'Course Name', 'Credits',
-                'Areas of Knowledge', 'Quarters Offered', 'Offered with', 
-                'Prerequisites', 'Co-Requisites', 'Description'
-            """
+        def extract_data(dep_file):
+            """ Parses one department page of the campus, see 'parse_department' """
             # Update the progress bar
             if show_progress:
                 progress_bar.update()
+            return parse_department(campus, dep_file, use_cache, bundle)
 
-            # Regular expressions for searching course descriptions stored in local variables
-            # for better peformance
-            local_course_re = course_re
-            local_course_name_re = course_name_re
-            local_credits_re = credits_re
-            local_credits_num_re = credits_num_re
-            local_offered_jointly_re = offered_jointly_re
-            local_CAMPUSES = CAMPUSES
-
-            # Method used in extracting data from course descriptions found in the local scope
-            # are stored in local variables for better performance
-            local_complete_description = complete_description
-            local_get_offered = get_offered
-            local_get_requisites = get_requisites
-
-            # All the courses in the department
-            courses = []
-            dep_file = department_link.get('href')
-
-            # If the user entered a dict as the 'campuse' parameter, departments
-            # are checked here
-            try:
-                # The String in the conditional is the abbreviated Department Name i.e EE
-                # for Electrical Engineering
-                if normalize('NFKD', department_link.text).rsplit('(', 1) \
-                    [-1].replace(' ', '')[:-1] not in campuses[campus]:
-                    return None
-            except TypeError:
-                pass
-                
-            # The only links that are used for finding departments are those
-            # of the format [a-z]+.html
-            if '/' not in dep_file and dep_file.endswith('.html') \
-                                   and dep_file not in parsed_departments:
-                parsed_departments.add(dep_file)
-                department = BeautifulSoup(requests.get( \
-                            f'{local_CAMPUSES[campus]}{dep_file}').text, features='lxml')
-                for course in department.find_all('a'):
-                    course_ID = course.get('name')  
-                    if course_ID:
-                        course_ID = course_ID.upper()
-                        course_title = course.find('b').text
-                        # The Course Description
-                        description = course.get_text().replace(course_title, '', 1)        
-                        instructors = course.find('i')
-                        if instructors:
-                            description = description.replace(str(instructors.get_text()), '', 1)
-                        del instructors
-                        course_text = local_complete_description( \
-                                        description.rsplit('View course details in MyPlan', 1)[0])
-                        # Course Number i.e 351
-                        course_number = re.sub(local_course_re, '', course_ID)
-                        match_name = re.search(local_course_name_re, course_title)
-                        match_credit_num = re.search(local_credits_num_re, course_title)
-                        match_credit_types = re.findall(local_credits_re, course_title)
-                        # Jointly offered course with the given course
-                        if 'jointly with' in course_text:                                                   
-                            offered_jointly = course_text.rsplit('jointly with ', 1)[-1].rsplit(';', 1)[0]                                
-                            offered_jointly = ','.join(re.findall( \
-                                local_offered_jointly_re, offered_jointly)).replace(' ', '') 
-                        else:
-                            offered_jointly = ''
-                        courses.append(
-                                # Campus, Department Name and Course Number
-                                [campus, course_ID[:-3], course_number, 
-                                # Course Name
-                                match_name.group(0).split(course_number, 1)[-1].strip() \
-                                                            if match_name else '',
-                                # Number of credits for the course
-                                match_credit_num.group(0)[1:-1] \
-                                                            if match_credit_num else '', 
-                                # Course Credit Types (I&S, DIV, NW, VLPA, QSR, C)
-                                ','.join([list(filter(('').__ne__, x))[0] for x in match_credit_types]) \
-                                                            if match_credit_types else '', 
-                                local_get_offered(course_text),
-                                offered_jointly, local_get_requisites(course_text, 'Prerequisite:'), 
-                                local_get_requisites(course_text, 'Co-requisite'), course_text]
-                        )
-            return courses
-
-        # In the course catalog website, several department links appear multiple times
-        # To prevent parsing the same department more than once, parsed departments
-        # are tracked in 'parsed_departments'
-        parsed_departments = set()
         local_extract_data = extract_data
-        department_data = BeautifulSoup(requests.get(department_data).text, features='lxml')
-
         campus_catalog = []
         # Extract data from department websites in parallel to reduce idle time
         with cf.ThreadPoolExecutor() as executor:
-            results = [executor.submit(local_extract_data, department_link) 
-                       for department_link in department_data.find_all('a')]
+            results = {executor.submit(local_extract_data, dep_file): (abbrev, dep_file)
+                       for dep_file, abbrev in department_plan}
             for result in cf.as_completed(results):
-                dptmnt = result.result()
+                try:
+                    dptmnt = result.result()
+                except Exception as e:
+                    if failures is None:
+                        raise
+                    abbrev, dep_file = results[result]
+                    failures.append(fetch.failure(campus, abbrev, f'{CAMPUSES[campus]}{dep_file}', e))
+                    continue
                 if dptmnt:
                     campus_catalog.append(dptmnt)
 
-        # DataFrame with all courses in the campus
-        return pd.DataFrame(
-            [course for department in campus_catalog for course in department], 
-            columns=COLUMN_NAMES
-        )
+        # All courses in the campus
+        return [course for department in campus_catalog for course in department]
 
-    # The pandas DataFrame to store the entire course catalog for each UW Campus entered
-    # by the user
-    course_catalog = pd.DataFrame()
+    failures = [] if partial_ok else None
+    selected = [campus for campus in CAMPUSES if campus.title() in campuses]
+    if bundle is not None:
+        # Bundles hold one campus each, campuses without a bundle are skipped
+        selected = [campus for campus in selected if CAMPUSES[campus] in bundle]
 
-    # Parse all three campuses in parallel for faster run time as well
-    # as get the departments dictionary from the 'get_departments' method
-    # to add a 'Colleges' column to categorize all courses in their College.
+    # Download each campus course catalog index page once. The same page is used for the
+    # 'College' column and for planning which department pages to parse.
+    sources = {}
     with cf.ThreadPoolExecutor() as executor:
-        results = []
-        campuses_for_dict = campuses
-        if type(campuses) == dict:
-            campuses_for_dict = list(campuses.keys())
-        results.append(executor.submit(get_departments, campuses=campuses_for_dict, struct='dict'))
-        for campus, link in CAMPUSES.items():
-            if campus.title() in campuses: 
-                results.append(executor.submit(parse_campus, link, campus.title()))
+        pages = {executor.submit(get, CAMPUSES[campus]): campus for campus in selected}
+        for page in cf.as_completed(pages):
+            campus = pages[page]
+            try:
+                sources[campus] = fetch.check(page.result()).text
+            except Exception as e:
+                if failures is None:
+                    raise
+                failures.append(fetch.failure(campus, None, CAMPUSES[campus], e))
+    sources = {campus: sources[campus] for campus in selected if campus in sources}
+
+    # Departments dict used to create the 'College' column in the main DataFrame
+    departments = {campus: campus_departments(source, use_cache) for campus, source in sources.items()}
+    # Every department page is planned (and de-duplicated) before any page is requested
+    plans = {campus: plan_catalog(source, campuses[campus] if type(campuses) == dict else None)
+             for campus, source in sources.items()}
+
+    # Parse all campuses in parallel for faster run time. Courses are accumulated column by
+    # column and the DataFrame (or Arrow table) is built once at the end.
+    courses = Columns(COLUMN_NAMES)
+    with cf.ThreadPoolExecutor() as executor:
+        results = [executor.submit(parse_campus, plan, campus) for campus, plan in plans.items()]
         for result in cf.as_completed(results):
-            returned = result.result()
-            if type(returned) == dict:
-                # Departments dict used to create the 'College' column in the main DataFrame
-                departments = returned
-            else:
-                course_catalog = pd.concat([course_catalog, returned])
+            courses.extend(result.result())
 
-    # Add Course ID as the index of the DataFrame to allow for easy course searching
-    # Course ID = Department Name + Course Number
-    # Example: EE235 = EE + 235
-    course_catalog['Course ID'] = course_catalog['Department Name'] + course_catalog['Course Number']
-    course_catalog['College'] = course_catalog['Department Name'].apply(check_campus, args=(departments, 'College'))
-    course_catalog.set_index('Course ID', inplace=True)
-    # Re-order indices to place 'College' right after the 'Department Name'
-    course_catalog = course_catalog[['Campus', 'Department Name', 'College', 'Course Number', 'Course Name', 'Credits',
-                                    'Areas of Knowledge', 'Quarters Offered', 'Offered with', 
-                                    'Prerequisites', 'Co-Requisites', 'Description']]
-    
-    if struct == 'df':
-        return course_catalog
-    elif struct == 'dict':
-        return course_catalog.to_dict(orient='index')
+    if struct == 'arrow':
+        course_catalog = arrow_catalog(courses, departments)
+        return (course_catalog, failures) if partial_ok else course_catalog
+    elif struct in ['dict', 'tuples']:
+        course_catalog = catalog_records(courses, departments, struct)
+        return (course_catalog, failures) if partial_ok else course_catalog
+
+    course_catalog = catalog_frame(courses, departments)
+    return (course_catalog, failures) if partial_ok else course_catalog
 
 
 def get_departments(campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
-                    flatten='default'):
+                    flatten='default', use_cache=True):
     """
     Returns the departments at UW for each campus
 
@@ -477,6 +645,9 @@ def get_departments(campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
         'struct':   The Data Structure to return the department data in
                     'df' -> Pandas DataFrame
                     'dict' -> Python Dictionary
+                    'list' -> Python List
+                    'arrow' -> pyarrow Table with one row per campus, college and
+                               department (requires pyarrow)
 
         'flatten':  If struct='dict', return a flattened dictionary of departments.
                     If struct='list', return a list of items specified by the 'flatten' parameter.
@@ -521,6 +692,9 @@ def get_departments(campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
                         'dep-full': Returns a list of all departments (full names) in
                                     every campus given in 'campuses     
 
+        'use_cache': If True, index pages whose content has not changed since they were
+                     last parsed are read from the memo instead of being parsed again
+
     Returns
 
         struct='df' or struct='dict':
@@ -536,16 +710,19 @@ def get_departments(campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
     # Check if all campuses in 'campuses' are valid
     assert all([c in ['Seattle', 'Bothell', 'Tacoma'] for c in list(map(str.title, campuses))])
     assert type(struct) == str, 'Type of "struct" must be str'
-    assert struct in ['df', 'dict', 'list'], f'{struct} is not a valid argument for "struct"'
+    assert struct in ['df', 'dict', 'list', 'arrow'], f'{struct} is not a valid argument for "struct"'
+    if struct == 'arrow':
+        require_arrow()
     assert type(flatten) == str, 'Type of "flatten" must be str'
     assert flatten in ['default', 'college', 'department', 'campus', 
                        'campege', 'dep-abbrev', 'dep-full'], f'{flatten} is not a valid argument for "flatten"'
     if struct == 'list':
         assert flatten in ['college', 'dep-abbrev', 'dep-full'], f'''{flatten} is not a valid 
                                 argument for "flatten" with 'struct="list"' '''
+    assert type(use_cache) == bool, 'Type of "use_cache" must be bool'
 
     # Get UW Campus Course Catalog page sources, used for parallel processing
-    campus_source = lambda x: (requests.get(CAMPUSES[x]).text, x)
+    campus_source = lambda x: (fetch.get(CAMPUSES[x]).text, x)
 
     # Dictionary with UW Campus to Department Dictionary mappings
     departments = {}
@@ -556,31 +733,15 @@ def get_departments(campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
         for f in cf.as_completed(pages):
             # Source -> Page Source for given UW Campus Course Catalog
             source, campus = f.result()
-            departments[campus] = {}
-            source = BeautifulSoup(source.rsplit('class="col-md-4 uw-sidebar"', 1)[0], features='lxml')
-            # College Names at UW i.e. College of Built Environments, College of Engineering, etc...
-            college_names = [c.get_text() for c in source.find_all('h2', {'id': re.compile(r'[A-Za-z]+')})]
-            colleges = str(source).split('<h2 id=')
-            for i, college in enumerate(colleges[1:]):
-                departments[campus][college_names[i]] = {}
-                college = BeautifulSoup(college, features='lxml')
-                # Department Names are found in the anchor tags on the course catalog website
-                for dep_name in college.find_all('a'):
-                    # There are some non-breaking spaces ('\xa0', encoding='ISO-8859-1') which
-                    # are removed through the 'normalize' function
-                    dep_name = normalize('NFKD', dep_name.text)
-                    try:
-                        full_name, abbrev = dep_name.rsplit('(', 1)
-                    except ValueError:
-                        pass
-                    else:
-                        if '(' in dep_name and '--' not in dep_name:
-                            abbrev = abbrev.replace(' ', '')[:-1]
-                            if not abbrev.startswith('See'):
-                                departments[campus][college_names[i]][abbrev] = \
-                                    full_name.strip()
-
-    if struct == 'df':
+            departments[campus] = campus_departments(source, use_cache)
+
+    if struct == 'arrow':
+        columns = Columns(['Department', 'Department Name', 'Campus', 'College'])
+        columns.extend((dep_abb, dep_full, campus, college) for campus, colleges in departments.items()
+                                                            for college, deps in colleges.items()
+                                                            for dep_abb, dep_full in deps.items())
+        return to_table([columns.to_arrow(plain=('Department Name',))])
+    elif struct == 'df':
         df = pd.DataFrame().from_dict(
             # Flatten dict for DataFrame construction
             # [dn] -> Department Name, [dfull] -> Full Name, [c] -> Campus
@@ -628,4 +789,96 @@ def get_departments(campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
         elif flatten == 'dep-full':
             return [dep_full for college in departments.values() 
                              for col_name in college.values() 
-                             for dep_full in col_name.values()]
\ No newline at end of file
+                             for dep_full in col_name.values()]
+
+def catalog_frame(courses, departments):
+    """
+    Builds the course catalog DataFrame from the parsed courses
+
+    @params
+
+        'courses': Columns with the COLUMN_NAMES columns
+
+        'departments': Campus -> College -> Department Abbreviation -> Department Full Name,
+                       used for the 'College' column
+
+    Returns
+
+        A pandas DataFrame indexed by Course ID
+    """
+    # The pandas DataFrame to store the entire course catalog for each UW Campus entered
+    # by the user
+    course_catalog = pd.DataFrame(courses.columns, columns=COLUMN_NAMES)
+
+    # Add Course ID as the index of the DataFrame to allow for easy course searching
+    # Course ID = Department Name + Course Number
+    # Example: EE235 = EE + 235
+    course_catalog['Course ID'] = course_catalog['Department Name'] + course_catalog['Course Number']
+    course_catalog['College'] = course_catalog['Department Name'].apply(check_campus, args=(departments, 'College'))
+    course_catalog.set_index('Course ID', inplace=True)
+    # Re-order indices to place 'College' right after the 'Department Name'
+    return course_catalog[CATALOG_KEYS]
+
+
+def college_lookup(departments):
+    """
+    Returns
+
+        Dictionary of department full name or abbreviation -> College, the same lookup as
+        check_campus(..., 'College') computed once instead of once per course
+    """
+    colleges = {}
+    for college in departments.values():
+        for col_name, deps in college.items():
+            for dep_a, dep_f in deps.items():
+                colleges.setdefault(dep_f, col_name)
+                colleges.setdefault(dep_a, col_name)
+    return colleges
+
+
+def catalog_records(courses, departments, struct='dict'):
+    """
+    Builds the course catalog records straight from the accumulated course columns
+
+    @params
+
+        'courses': Columns with the COLUMN_NAMES columns
+
+        'departments': Campus -> College -> Department Abbreviation -> Department Full Name
+
+        'struct': 'dict' -> Dictionary of Course ID -> CATALOG_KEYS dictionary
+                  'tuples' -> List of CatalogCourse named tuples
+
+    Returns
+
+        The course catalog in the given structure
+    """
+    colleges = college_lookup(departments)
+    columns = courses.columns
+    course_ids = map(str.__add__, columns['Department Name'], columns['Course Number'])
+    values = zip(course_ids, columns['Campus'], columns['Department Name'],
+                 map(colleges.get, columns['Department Name']), *[columns[k] for k in COLUMN_NAMES[2:]])
+    if struct == 'tuples':
+        return list(map(CatalogCourse._make, values))
+    return {row[0]: dict(zip(CATALOG_KEYS, row[1:])) for row in values}
+
+
+def arrow_catalog(courses, departments):
+    """
+    Builds the course catalog Arrow table from the accumulated course columns
+
+    @params
+
+        'courses': Columns with the COLUMN_NAMES columns
+
+        'departments': Campus -> College -> Department Abbreviation -> Department Full Name
+
+    Returns
+
+        A pyarrow Table
+    """
+    colleges = college_lookup(departments)
+    courses.add('Course ID', map(str.__add__, courses.columns['Department Name'], courses.columns['Course Number']))
+    courses.add('College', map(colleges.get, courses.columns['Department Name']))
+    order = ['Course ID'] + CATALOG_KEYS
+    return to_table([courses.to_arrow(order, plain=('Course ID', 'Description'))])
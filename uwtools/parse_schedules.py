@@ -4,7 +4,7 @@ upcoming quarter of UW. If the courses for the upcoming quarter are not availabl
 are used. The current quarter is calculated, no need to enter any information.
 """
 
-import json, math, re, calendar, datetime, time, os, requests
+import json, math, re, calendar, datetime, time, os, sys, threading
 from pkgutil import get_data
 from zlib import compress, decompress
 from itertools import chain
@@ -15,6 +15,10 @@ from tqdm import tqdm
 from bs4 import BeautifulSoup
 import concurrent.futures as cf
 from multiprocessing import Process
+from . import fetch, memo
+from .bundle import open_bundles, close_bundles
+from .columnar import Columns, pa, require_arrow, to_table
+from .parse_buildings import lookup_coordinates
 
 
 # Links to the Time Schedules for each UW Campus
@@ -33,8 +37,93 @@ CAMPUSES_TIMES = {
         }
 }
 
+# Bump when a change to the parser changes its output, invalidating memoized pages
+SCHEDULE_PARSER_VERSION = 1
+
 COURSE_KEYS = ['Course Name', 'Seats', 'SLN', 'Section', 'Type', 'Days', 'Time', 'Building', 'Room Number']
 
+# Columns of the Time Schedules, in order, with and without 'include_datetime'
+SCHEDULE_KEYS = COURSE_KEYS + ['Campus', 'Year', 'Quarter']
+DATETIME_KEYS = ['Course Name', 'Seats', 'SLN', 'Section', 'Type', 'Days', 'Time', 
+                 'Start', 'End', 'Building', 'Room Number', 'Campus', 'Quarter', 'Year']
+
+# Order of the quarters in an academic year
+QUARTERS = ['AUT', 'WIN', 'SPR', 'SUM']
+
+# Seconds for which the result of 'latest_quarter' is reused
+LATEST_TTL = 600
+latest_cache = {}
+latest_lock = threading.Lock()
+
+
+class Section:
+    """
+    Compact record of one Time Schedule section, used by struct='sections'.
+
+    Repeated strings (course names, types, days, buildings, ...) are interned so every
+    section shares the same string objects, and the SLN and Seats are stored as ints.
+    """
+    __slots__ = ('course_name', 'seats', 'sln', 'section', 'type', 'days', 'time',
+                 'building', 'room_number', 'campus', 'year', 'quarter', 'start', 'end')
+
+    def __init__(self, course_name, seats, sln, section, type_, days, time, building,
+                 room_number, campus, year, quarter, start=None, end=None):
+        self.course_name = course_name
+        self.seats = seats
+        self.sln = sln
+        self.section = section
+        self.type = type_
+        self.days = days
+        self.time = time
+        self.building = building
+        self.room_number = room_number
+        self.campus = campus
+        self.year = year
+        self.quarter = quarter
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def from_row(cls, row, campus, year, quarter):
+        """
+        Creates a Section from a row returned by 'parse_schedules'
+
+        @params
+
+            'row': List of the COURSE_KEYS values of the section, possibly shorter
+
+            'campus', 'year', 'quarter': The campus, year and quarter of the section
+
+        Returns
+
+            The Section
+        """
+        intern = sys.intern
+        # Empty values stay '' like in the records of struct='dict', only missing ones are None
+        values = [v if v is None else intern(v) for v in row] + [None] * (len(COURSE_KEYS) - len(row))
+        course_name, seats, sln = values[0:3]
+        return cls(course_name, int(seats) if seats and seats.isdigit() else None,
+                   int(sln) if sln and sln.isdigit() else None, *values[3:],
+                   intern(campus), year, intern(quarter))
+
+    def to_dict(self):
+        """
+        Returns
+
+            A dictionary with the same keys as the records of struct='dict'
+        """
+        record = {key: getattr(self, slot) for key, slot in zip(SCHEDULE_KEYS, SECTION_SLOTS)}
+        if self.start is not None or self.end is not None:
+            record['Start'], record['End'] = self.start, self.end
+        return record
+
+    def __repr__(self):
+        return f'Section({self.course_name} {self.section} SLN={self.sln} {self.days} {self.time})'
+
+
+# Section attributes, in the order of SCHEDULE_KEYS
+SECTION_SLOTS = Section.__slots__[:len(SCHEDULE_KEYS)]
+
 
 def get_academic_year(year):
     """
@@ -55,7 +144,166 @@ def get_academic_year(year):
     return str(year)[2:] + str(year + 1)[2:]
 
 
-def parse_departments(campus, year, quarter, progress_bar):
+key_re = re.compile(r'[^A-Z0-9]')
+department_re = re.compile(r'^(.*?)\s*\d+\s*$')
+
+def course_key(name):
+    """
+    Normalizes a course name, Course ID or department abbreviation
+
+    @params
+
+        'name': i.e. 'E E 235', 'EE 235', 'ee235' or 'E E'
+
+    Returns
+
+        The shared key of the course, i.e. 'EE235' (or 'EE' for a department)
+    """
+    return key_re.sub('', name.upper()) if isinstance(name, str) else ''
+
+
+def department_key(course):
+    """
+    Returns
+
+        The normalized department of a course name, i.e. 'E E 235' -> 'EE'
+    """
+    match = department_re.match(course)
+    return course_key(match.group(1) if match else course)
+
+
+def current_quarter(today=None):
+    """
+    Returns
+
+        The (year, quarter) tuple of the quarter in session on the given date (default today)
+    """
+    today = today or datetime.date.today()
+    if today.month <= 3:
+        return today.year, 'WIN'
+    if today.month <= 6:
+        return today.year, 'SPR'
+    if today.month <= 8:
+        return today.year, 'SUM'
+    return today.year, 'AUT'
+
+
+def next_quarter(year, quarter):
+    """
+    Returns
+
+        The (year, quarter) after the given one, i.e. (2024, 'AUT') -> (2025, 'WIN')
+    """
+    if quarter == 'AUT':
+        return year + 1, 'WIN'
+    return year, QUARTERS[(QUARTERS.index(quarter) + 1) % len(QUARTERS)]
+
+
+def previous_quarter(year, quarter):
+    """
+    Returns
+
+        The (year, quarter) before the given one, i.e. (2025, 'WIN') -> (2024, 'AUT')
+    """
+    if quarter == 'WIN':
+        return year - 1, 'AUT'
+    return year, QUARTERS[QUARTERS.index(quarter) - 1]
+
+
+def candidate_quarters(today=None):
+    """
+    Returns
+
+        The quarters whose Time Schedules may be the latest published on the given date,
+        newest first: the two quarters after the current one, the current one and the
+        previous one (in case the current one is not published yet)
+    """
+    current = current_quarter(today)
+    upcoming = next_quarter(*current)
+    return [next_quarter(*upcoming), upcoming, current, previous_quarter(*current)]
+
+
+def latest_quarters(campuses, today=None, bundle=None, use_cache=True):
+    """
+    Finds the latest published quarter of several campuses at once. Every candidate
+    quarter of every campus is probed in parallel with a HEAD request of its index page.
+
+    @params
+
+        'campuses': The campuses to check
+
+        'today': The date to find the candidate quarters from, defaults to today
+
+        'bundle': Optional opened snapshot bundle the index pages are looked up in
+                  instead of probing the websites
+
+        'use_cache': If True, results younger than LATEST_TTL seconds are reused
+
+    Returns
+
+        A dictionary of campus -> (year, quarter), None for campuses without any
+        published candidate quarter
+    """
+    candidates = candidate_quarters(today)
+    exists = fetch.probe if bundle is None else (lambda url: bundle.get(url).ok)
+    cacheable = use_cache and bundle is None
+    latest = {}
+    with latest_lock:
+        for campus in campuses:
+            cached = latest_cache.get((campus, candidates[0]))
+            if cacheable and cached is not None and cached[0] > time.monotonic():
+                latest[campus] = cached[1]
+
+    probes = {}
+    with cf.ThreadPoolExecutor() as executor:
+        for campus in campuses:
+            if campus not in latest:
+                for year, quarter in candidates:
+                    url = '{}{}{}/'.format(CAMPUSES_TIMES[campus]['link'], quarter, year)
+                    probes[campus, year, quarter] = executor.submit(exists, url)
+
+    for campus in campuses:
+        if campus in latest:
+            continue
+        errors = False
+        latest[campus] = None
+        for year, quarter in candidates:
+            try:
+                if probes[campus, year, quarter].result():
+                    latest[campus] = (year, quarter)
+                    break
+            except Exception:
+                errors = True
+        # Probes that failed may hide a published quarter, so those results are not cached
+        if cacheable and not errors:
+            with latest_lock:
+                latest_cache[campus, candidates[0]] = (time.monotonic() + LATEST_TTL, latest[campus])
+    return latest
+
+
+def latest_quarter(campus='Seattle', today=None, use_cache=True):
+    """
+    Finds the latest quarter whose Time Schedules are published
+
+    @params
+
+        'campus': The campus to check
+
+        'today': The date to find the candidate quarters from, defaults to today
+
+        'use_cache': If True, a result younger than LATEST_TTL seconds is reused
+
+    Returns
+
+        The (year, quarter) tuple of the latest published quarter (i.e. (2025, 'WIN')),
+        or None if none of the candidate quarters are published
+    """
+    campus = campus.title()
+    assert campus in CAMPUSES_TIMES, f'{campus} is not a valid campus'
+    return latest_quarters([campus], today, use_cache=use_cache)[campus]
+
+
+def plan_departments(campus, year, quarter, links=None, bundle=None):
     """
     Finds all department schedule websites for the given campus
 
@@ -64,29 +312,28 @@ def parse_departments(campus, year, quarter, progress_bar):
         'campus': The campus to get schedules from
 
         'year': Must be an int. Years must be >= 2003.
-                If a year is entered and a quarter is not, all quarters from that year will be parsed.
 
         'quarter': Must be a str. Each quarter must be either 'AUT', 'WIN', 'SPR', or 'SUM'.
 
-    NOTE:
-        For all academic years before and including 2006-2007, some 
-        4-digit (and some older 5-digit) SLN codes will not work.
+        'links': Optional dict with the 'link' and 'schedule' websites to use instead of
+                 those in CAMPUSES_TIMES for the given campus (i.e. a local mirror)
+
+        'bundle': Optional opened snapshot bundle the index page is read from
 
     Returns
 
-        A pandas DataFrame object with the time schedule information for the given year
-        and quarter combination for the given campus.
+        A list of (department abbreviation, department schedule website) tuples,
+        or None if the Time Schedules for the given quarter are not available.
     """
+    links = links or CAMPUSES_TIMES[campus]
     # Find current quarter at UW based on the current date
-    current_courses_link = '{}{}{}/'.format(CAMPUSES_TIMES[campus]['link'], 
-                                            quarter, year)
+    current_courses_link = '{}{}{}/'.format(links['link'], quarter, year)
 
     # Check to see if the Time Schedules for the current quarter is available.
     # If neither of the above can be parsed, the script returns None.
-    current_courses_requests = requests.get(current_courses_link)
+    current_courses_requests = (fetch if bundle is None else bundle).get(current_courses_link)
     if current_courses_requests.ok:
-        courses_link = '{}{}{}/'.format(CAMPUSES_TIMES[campus]['schedule'], 
-                                        quarter, year)
+        courses_link = '{}{}{}/'.format(links['schedule'], quarter, year)
     else:
         return None
     
@@ -111,27 +358,128 @@ def parse_departments(campus, year, quarter, progress_bar):
     list_items = dep_soup.find_all('li')
     get_course = lambda x: x.rsplit('(', 1)[-1].split(')', 1)[0]
     lowercase_re = re.compile(r'[a-z]+')
-    campus_schedules = []
+    plan = []
+    for link, li in zip(anchor_tag, list_items):
+        dep = get_course(li.get_text()).upper() if is_bothell else get_course(link[1])
+        if not re.search(lowercase_re, dep):
+            plan.append((dep, '{}{}'.format(courses_link, link[0].rsplit('/', 1)[-1])))
+    return plan
+
+
+def filter_plan(plan, departments=None, courses=None):
+    """
+    Keeps the departments of a link plan that are requested
+
+    @params
+
+        'plan': The (department abbreviation, department schedule website) tuples
+                returned by 'plan_departments'
+
+        'departments': Optional list of department abbreviations to keep
+
+        'courses': Optional list of course names whose departments are kept
 
+    Returns
+
+        The filtered plan. With both filters, only departments in 'departments' that
+        have a course in 'courses' are kept.
+    """
+    if departments is not None:
+        keep = {course_key(d) for d in departments}
+        plan = [(dep, link) for dep, link in plan if course_key(dep) in keep]
+    if courses is not None:
+        keep = {department_key(c) for c in courses}
+        plan = [(dep, link) for dep, link in plan if course_key(dep) in keep]
+    return plan
+
+
+def parse_departments(campus, year, quarter, progress_bar, use_cache=True, struct='df', failures=None,
+                      bundle=None, departments=None, courses=None):
+    """
+    Parses the Time Schedules of all departments for the given campus
+
+    @params
+
+        'campus': The campus to get schedules from
+
+        'year': Must be an int. Years must be >= 2003.
+                If a year is entered and a quarter is not, all quarters from that year will be parsed.
+
+        'quarter': Must be a str. Each quarter must be either 'AUT', 'WIN', 'SPR', or 'SUM'.
+
+        'use_cache': Passed on to 'parse_schedules'
+
+        'struct': 'df' -> Pandas DataFrame
+                  'dict' -> List of SCHEDULE_KEYS dictionaries, without pandas
+                  'arrow' -> Columns accumulated column by column, without pandas
+                  'sections' -> List of Section records, without pandas
+
+        'failures': If a list is given, departments that fail are added to it (see
+                    'fetch.failure') and skipped instead of raising the error
+
+        'bundle': Optional opened snapshot bundle the pages are read from
+
+        'departments': Optional list of department abbreviations (i.e. ['CSE', 'E E']).
+                       Only the pages of these departments are fetched and parsed.
+
+        'courses': Optional list of course names (i.e. ['CSE 142', 'E E 235']). Only the
+                   pages of their departments are fetched, and only their sections are kept.
+
+    NOTE:
+        For all academic years before and including 2006-2007, some 
+        4-digit (and some older 5-digit) SLN codes will not work.
+
+    Returns
+
+        A pandas DataFrame object (or records, or Columns) with the time schedule information
+        for the given year and quarter combination for the given campus.
+    """
+    plan = plan_departments(campus, year, quarter, bundle=bundle)
+    if plan is None:
+        return None
+    plan = filter_plan(plan, departments, courses)
+    wanted = None if courses is None else {course_key(c) for c in courses}
+
+    campus_schedules = []
+    columns = Columns(COURSE_KEYS) if struct == 'arrow' else None
+    from_row = Section.from_row
     local_parse_schedules = parse_schedules
 
     with cf.ThreadPoolExecutor() as executor:
-        results = []
+        results = {}
         # Go through the Main Time Schedule page for the given quarter and year and parse each department's page
-        for link, li in zip(anchor_tag, list_items):
+        for dep, dep_schedule in plan:
             if progress_bar is not None:
                 progress_bar.update()
-            dep = get_course(li.get_text()).upper() if is_bothell else get_course(link[1])
-            dep_schedule = '{}{}'.format(courses_link, link[0].rsplit('/', 1)[-1])
-            if not re.search(lowercase_re, dep):
-                results.append(
-                    executor.submit(local_parse_schedules, dep_schedule)
-                )
+            results[executor.submit(local_parse_schedules, dep_schedule, use_cache, bundle)] = (dep, dep_schedule)
         for result in cf.as_completed(results):
-            courses = result.result()
+            try:
+                dep_courses = result.result()
+            except Exception as e:
+                if failures is None:
+                    raise
+                failures.append(fetch.failure(campus, *results[result], e))
+                continue
+            if wanted is not None:
+                dep_courses = [row for row in dep_courses if course_key(row[0]) in wanted]
             # If no courses are found for the given department, they are not added to the main list
-            if courses:
-                campus_schedules.append(courses) 
+            if dep_courses:
+                if columns is not None:
+                    columns.extend(dep_courses)
+                elif struct == 'sections':
+                    campus_schedules.extend(from_row(row, campus, year, quarter) for row in dep_courses)
+                elif struct == 'dict':
+                    campus_schedules.extend(row_records(dep_courses, campus, year, quarter))
+                else:
+                    campus_schedules.append(dep_courses) 
+
+    if columns is not None:
+        columns.fill('Campus', campus)
+        columns.fill('Year', year)
+        columns.fill('Quarter', quarter)
+        return columns
+    elif struct in ['sections', 'dict']:
+        return campus_schedules
                 
     total = [y for x in campus_schedules for y in x] 
     # Store data in a pandas DataFrame
@@ -148,7 +496,7 @@ seats_re = re.compile(r'[A-Za-z]+')
 extra_section_re = re.compile(r'[MTWhF]+\s+\d+\-\d+P?\s+[A-Z\d]+\s+[A-Za-z/\+\-\d]+')
 lecture_re = re.compile(r'[\*,\[\]\.max\d/ \-]+|(VAR)')
 
-def parse_schedules(department):
+def parse_schedules(department, use_cache=True, bundle=None):
     """
     Creates a dictionary of course, schedule pairings
 
@@ -156,6 +504,12 @@ def parse_schedules(department):
 
         'department': The department schedule website
 
+        'use_cache': If True, the parsed page is looked up in (and stored to) the memo
+                     keyed by the page content, so unchanged pages are not parsed again
+
+        'bundle': Optional opened snapshot bundle (see 'bundle.open_bundles') the page is
+                  read from instead of being downloaded
+
     Returns
 
         A list of lists. Each nested list contains the following Course Time Data:
@@ -163,12 +517,38 @@ def parse_schedules(department):
             'Days', 'Time', 'Building', 'Room Number'
         in that order.
     """
+    source = fetch.check((fetch if bundle is None else bundle).get(department)).text
+    if not use_cache:
+        return parse_schedule_page(source)
+    key = memo.content_key(source, 'schedule', SCHEDULE_PARSER_VERSION)
+    department_schedule = memo.load(key)
+    if department_schedule is None:
+        department_schedule = parse_schedule_page(source)
+        memo.store(key, department_schedule)
+    return department_schedule
+
+
+def parse_schedule_page(source, enrollment=None):
+    """
+    Parses the Time Schedule page source of a department
+
+    @params
+
+        'source': The page source of the department schedule website
+
+        'enrollment': Optional dictionary that is filled with SLN -> (enrolled, limit)
+                      for every section listing its enrollment
+
+    Returns
+
+        The parsed sections, see 'parse_schedules'
+    """
     local_fill = fill
     local_seats_re = seats_re
     local_extra_section_re = extra_section_re
     local_lecture_re = lecture_re
     department_schedule = []
-    department = BeautifulSoup(requests.get(department).text, features='lxml')
+    department = BeautifulSoup(source, features='lxml')
     course_schedule = str(department).split('<br/>', 2)[-1]
     # All unique courses are split by a <br> in the Time Schedules website
     for sections in course_schedule.split('<br/>'):
@@ -187,6 +567,7 @@ def parse_schedules(department):
                     text = text.replace('IS', '').strip()
                     seats = re.search(local_fill, text)
                     if seats:
+                        enrolled = seats.group(0).split('/', 1)[0].strip()
                         seats = re.sub(local_seats_re, '', seats.group(0).split('/', 1)[-1].strip())
                     open_closed = local_fill.split(text, 1)
                     extract = open_closed[0].rsplit(',', 1)[0].rsplit(' ', 1)[0].strip()
@@ -208,6 +589,8 @@ def parse_schedules(department):
                             extras = list(chain(text[0:5], filter(None, extra_section.group(0).split())))
                             department_schedule.append(extras)
                         department_schedule.append(text)
+                        if enrollment is not None and seats:
+                            enrollment[text[2]] = (int(enrolled), int(seats))
     return department_schedule
 
 
@@ -252,21 +635,33 @@ def to_time(time1):
 
 
 def gather(year, quarter, campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df',
-           include_datetime=False, show_progress=False, json_ready=False):
+           include_datetime=False, show_progress=False, json_ready=False, use_cache=True,
+           partial_ok=False, include_coordinates=False, bundle=None, courses=None):
     """
     Gathers the Time Schedules for the given UW Campuses
 
     @params
     
-        'year': The year to get time schedules from
+        'year': The year to get time schedules from, ignored if quarter='latest'
 
-        'quarter': The specific quarter to get time schedules from
+        'quarter': The specific quarter to get time schedules from, or 'latest' for the
+                   latest quarter each campus has published (see 'latest_quarter')
 
         'campuses': The Campuses to get the Time Schedules from
+                    Can either be a list of campuses, or a dictionary where
+                    the keys are the campuses and values are a list of departments
+                    to parse from that campus. Only the pages of these departments
+                    are fetched.
 
         'struct': The Data Structure to return the Time Schedule data in
                   'df' -> Pandas DataFrame
-                  'dict' -> Python Dictionary
+                  'dict' -> List of Python Dictionaries, one per section, built without pandas.
+                            'Start'/'End' times that cannot be converted are None.
+                  'arrow' -> pyarrow Table with dictionary encoded string columns, built
+                             without pandas (requires pyarrow)
+                  'sections' -> List of compact Section records with interned strings
+                                and int SLN/Seats, built without pandas. Uses a fraction
+                                of the memory of the other structures.
 
         'include_datetime': Adds two columns to the DataFrame/Dict, ['Start', 'End'] which
                             are datetime objects representing the start and ending times for
@@ -281,35 +676,132 @@ def gather(year, quarter, campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df'
                       json_ready removes all the datetime objects to prevent TypeErrors
                       when converting to JSON. 
 
+        'use_cache': If True, department pages whose content has not changed since they were
+                     last parsed are read from the memo instead of being parsed again
+
+        'partial_ok': If True, departments (or campuses) whose pages fail to download or parse
+                      are skipped instead of aborting the whole run
+
+        'include_coordinates': Adds 'Latitude' and 'Longitude' columns for the 'Building' of each
+                               section, joined from the packaged building coordinates. The
+                               (Campus, Building) pairs without coordinates are listed in
+                               DataFrame.attrs['Unmatched Buildings'] (struct='df') or in the
+                               b'Unmatched Buildings' schema metadata (struct='arrow').
+                               Not available for struct='sections'.
+
+        'bundle': A snapshot bundle (or its path, or a list of them, one per campus) written
+                  by 'bundle.snapshot_schedules'. Pages are read from the bundle instead of
+                  being downloaded, campuses the bundle does not hold are skipped.
+
+        'courses': Optional list of course names (i.e. ['CSE 142', 'E E 235']). Only the
+                   sections of these courses are returned, and only the pages of their
+                   departments are fetched.
+
     Returns
 
         A Pandas DataFrame/Python Dictionary representing the Time Schedules 
-        for the given courses
+        for the given courses.
+        If 'partial_ok' is True, a tuple of the Time Schedules and a list of the failed
+        pages, each a dictionary with the 'Campus', 'Department', 'Link' and 'Error'.
     """
+    assert type(campuses) == list or type(campuses) == dict, 'Type of "campuses" must be list or dict'
+    if type(campuses) == dict:
+        for key, value in campuses.items():
+            if type(key) != str or type(value) != list:
+                raise ValueError('''"campuses" dict must have keys of type str and
+                                     values of type list''')
     # Check if all campuses in 'campuses' are valid
     assert all([c in ['Seattle', 'Bothell', 'Tacoma'] for c in list(map(str.title, campuses))])
+    assert courses is None or type(courses) == list, 'Type of "courses" must be list'
     assert type(struct) == str, 'Type of "struct" must be str'
-    assert struct in ['df', 'dict'], f'{struct} is not a valid argument for "struct"'
+    assert struct in ['df', 'dict', 'arrow', 'sections'], f'{struct} is not a valid argument for "struct"'
     assert type(include_datetime) == bool, 'Type of "include_datetime" must be bool'
     assert type(show_progress) == bool, 'Type of "show_progress" must be bool'
     assert type(json_ready) == bool, 'Type of "json_ready" must be bool'
+    assert type(use_cache) == bool, 'Type of "use_cache" must be bool'
+    assert type(partial_ok) == bool, 'Type of "partial_ok" must be bool'
+    assert type(include_coordinates) == bool, 'Type of "include_coordinates" must be bool'
+    assert not (include_coordinates and struct == 'sections'), \
+        '"include_coordinates" is not available with struct="sections"'
+
+    if struct == 'arrow':
+        require_arrow()
+    if bundle is not None:
+        opened = open_bundles(bundle)
+        if opened is not bundle:
+            # Bundles opened from paths are closed once the Time Schedules are gathered
+            try:
+                return gather(year, quarter, campuses, struct, include_datetime, show_progress,
+                              json_ready, use_cache, partial_ok, include_coordinates, opened, courses)
+            finally:
+                close_bundles(opened, bundle)
+
+    # The (year, quarter) of each campus, campuses without a published quarter are skipped
+    if quarter == 'latest':
+        quarters = latest_quarters([c.title() for c in campuses], bundle=bundle)
+    else:
+        quarters = {c.title(): (int(year), quarter) for c in campuses}
 
-    time_schedules = pd.DataFrame()
     if show_progress:
         progress_bar = tqdm()
 
+    failures = [] if partial_ok else None
+    time_schedules = pd.DataFrame()
+    batches, sections, records = [], [], []
+
     # Parse all UW Time Schedules for each campus in parallel
     with cf.ThreadPoolExecutor() as executor:
-        results = []
+        results = {}
         for campus in campuses:
-            results.append(
-                executor.submit(parse_departments, campus.title(), int(year), quarter, 
-                                progress_bar if show_progress else None)
-            )
+            if quarters[campus.title()] is None:
+                continue
+            results[executor.submit(parse_departments, campus.title(), *quarters[campus.title()],
+                                    progress_bar if show_progress else None, use_cache, 
+                                    struct, failures, bundle,
+                                    campuses[campus] if type(campuses) == dict else None,
+                                    courses)] = campus.title()
         for result in cf.as_completed(results):
-            schedule = result.result()
+            try:
+                schedule = result.result()
+            except Exception as e:
+                if failures is None:
+                    raise
+                failures.append(fetch.failure(results[result], None, None, e))
+                continue
             if schedule is not None:
-                time_schedules = pd.concat([time_schedules, schedule])
+                if struct == 'arrow':
+                    batches.append(arrow_schedules(schedule, include_datetime))
+                elif struct == 'sections':
+                    sections.extend(schedule)
+                elif struct == 'dict':
+                    records.extend(schedule)
+                else:
+                    time_schedules = pd.concat([time_schedules, schedule])
+
+    if struct == 'arrow':
+        time_schedules = to_table(batches, arrow_schedules(Columns(SCHEDULE_KEYS), include_datetime).schema)
+        if include_coordinates:
+            latitude, longitude, unmatched = lookup_coordinates(
+                time_schedules['Campus'].to_pylist(), time_schedules['Building'].to_pylist())
+            time_schedules = time_schedules.append_column('Latitude', pa.array(latitude, pa.float64())) \
+                                           .append_column('Longitude', pa.array(longitude, pa.float64()))
+            time_schedules = time_schedules.replace_schema_metadata(
+                {'Unmatched Buildings': json.dumps(unmatched)})
+        return (time_schedules, failures) if partial_ok else time_schedules
+    elif struct == 'sections':
+        if include_datetime:
+            # Times repeat across thousands of sections, each distinct time is only converted once
+            converted = {}
+            for section in sections:
+                if section.time not in converted:
+                    times = to_time(section.time)
+                    converted[section.time] = tuple(dttime.strptime(x, '%H:%M:%S').time() 
+                                                    for x in times) if times else (None, None)
+                section.start, section.end = converted[section.time]
+        return (sections, failures) if partial_ok else sections
+    elif struct == 'dict':
+        records = schedule_records(records, include_datetime, json_ready, include_coordinates)
+        return (records, failures) if partial_ok else records
 
     if include_datetime:
 
@@ -328,14 +820,97 @@ def gather(year, quarter, campuses=['Seattle', 'Tacoma', 'Bothell'], struct='df'
             time_schedules['Time'].apply(startend, args=(False,)), errors='ignore', format='%H:%M:%S'
         ).dt.time
         # Re-order indices of DataFrame
-        time_schedules = time_schedules[['Course Name', 'Seats', 'SLN', 'Section', 'Type', 'Time', 
-                    'Start', 'End', 'Building', 'Room Number', 'Campus', 'Quarter', 'Year']]
+        time_schedules = time_schedules[DATETIME_KEYS]
 
     time_schedules.index = range(len(time_schedules.index))
     time_schedules.index.name = 'Index'
-    if struct == 'df':
-        return time_schedules
-    elif struct == 'dict':
-        if json_ready and include_datetime:
-            time_schedules.drop(['Start', 'End'], axis=1, inplace=True)
-        return time_schedules.to_dict(orient='records')
\ No newline at end of file
+    if include_coordinates:
+        latitude, longitude, unmatched = lookup_coordinates(
+            time_schedules.get('Campus', []), time_schedules.get('Building', []))
+        time_schedules['Latitude'] = pd.Series(latitude, index=time_schedules.index, dtype=float)
+        time_schedules['Longitude'] = pd.Series(longitude, index=time_schedules.index, dtype=float)
+        time_schedules.attrs['Unmatched Buildings'] = unmatched
+    return (time_schedules, failures) if partial_ok else time_schedules
+
+
+def row_records(rows, campus, year, quarter):
+    """
+    Builds the struct='dict' records of rows returned by 'parse_schedules'
+
+    @params
+
+        'rows': Lists of the COURSE_KEYS values of each section, possibly shorter
+
+        'campus', 'year', 'quarter': The campus, year and quarter of the sections
+
+    Returns
+
+        A list of SCHEDULE_KEYS dictionaries
+    """
+    width = len(COURSE_KEYS)
+    # Short rows are padded with None like the DataFrame would
+    return [dict(zip(SCHEDULE_KEYS, [*row, *[None] * (width - len(row)), campus, year, quarter]))
+            for row in rows]
+
+
+def schedule_records(records, include_datetime, json_ready, include_coordinates):
+    """
+    Adds the optional columns of struct='dict' to the records returned by 'parse_departments',
+    in the same order as the columns of the DataFrame
+
+    @params
+
+        'records': The SCHEDULE_KEYS dictionaries of every section
+
+        'include_datetime', 'json_ready', 'include_coordinates': See 'gather'
+
+    Returns
+
+        The list of records
+    """
+    if include_datetime:
+        keys = [k for k in DATETIME_KEYS if not (json_ready and k in ['Start', 'End'])]
+        # Times repeat across thousands of sections, each distinct time is only converted once
+        converted = {}
+        for i, record in enumerate(records):
+            if record['Time'] not in converted:
+                times = to_time(record['Time'])
+                converted[record['Time']] = tuple(dttime.strptime(x, '%H:%M:%S').time()
+                                                  for x in times) if times else (None, None)
+            record['Start'], record['End'] = converted[record['Time']]
+            records[i] = {key: record[key] for key in keys}
+    if include_coordinates:
+        latitude, longitude, _ = lookup_coordinates([r['Campus'] for r in records],
+                                                    [r['Building'] for r in records])
+        for record, lat, lon in zip(records, latitude, longitude):
+            record['Latitude'], record['Longitude'] = lat, lon
+    return records
+
+
+def arrow_schedules(columns, include_datetime):
+    """
+    Builds an Arrow record batch from the Time Schedule columns of one campus
+
+    @params
+
+        'columns': Columns with the SCHEDULE_KEYS columns
+
+        'include_datetime': Adds the 'Start' and 'End' time columns
+
+    Returns
+
+        A pyarrow RecordBatch
+    """
+    types = {'Year': pa.int16()}
+    order = SCHEDULE_KEYS
+    if include_datetime:
+        # Times repeat across thousands of sections, each distinct time is only converted once
+        converted = {}
+        for t in set(columns.columns['Time']):
+            times = to_time(t)
+            converted[t] = tuple(dttime.strptime(x, '%H:%M:%S').time() for x in times) if times else (None, None)
+        columns.add('Start', (converted[t][0] for t in columns.columns['Time']))
+        columns.add('End', (converted[t][1] for t in columns.columns['Time']))
+        types['Start'] = types['End'] = pa.time32('s')
+        order = DATETIME_KEYS
+    return columns.to_arrow(order, types, plain=('SLN',))
@@ -0,0 +1,386 @@
+"""
+Plans the quarters in which to take a set of courses, using the 'Prerequisites',
+'Co-Requisites', 'Quarters Offered' and 'Credits' of the UW Course Catalogs.
+
+Courses are numbered and sets of courses are stored as bitsets (Python ints), so checking
+whether the requisites of a course are met is a handful of integer operations.
+
+Requisite strings (see 'parse_courses.get_requisites') are read as:
+
+    ';'   separates groups that are all required
+    ','   separates alternatives of a group, one of which is required
+    '&&'  separates courses that are all required by an alternative
+    '/'   separates courses any one of which is required
+"""
+
+import re
+import pandas as pd
+from .parse_schedules import course_key, current_quarter, next_quarter, QUARTERS
+
+# Letter of every quarter in 'Quarters Offered'
+QUARTER_LETTERS = {'AUT': 'A', 'WIN': 'W', 'SPR': 'Sp', 'SUM': 'S'}
+ALL_QUARTERS = 0b1111
+
+credits_re = re.compile(r'\d+(?:\.\d+)?')
+offered_re = re.compile(r'Sp|A|W|S')
+
+
+def offered_mask(offered):
+    """
+    Returns
+
+        Bitset of the quarters (bit i is QUARTERS[i]) in a 'Quarters Offered' string,
+        every quarter if the catalog does not list any
+    """
+    letters = {letter: i for i, letter in enumerate(QUARTER_LETTERS.values())}
+    mask = 0
+    for letter in offered_re.findall(offered or ''):
+        mask |= 1 << letters[letter]
+    return mask or ALL_QUARTERS
+
+
+def parse_credits(credits, default):
+    """
+    Returns
+
+        The lowest number of credits in a 'Credits' string (i.e. '1-5' -> 1), or 'default'
+    """
+    found = credits_re.findall(credits or '')
+    if not found:
+        return default
+    lowest = min(float(c) for c in found)
+    return int(lowest) if lowest.is_integer() else lowest
+
+
+class DegreePlanner:
+    """
+    Compiled prerequisite graph of a course catalog
+
+    @params
+
+        'catalog': Output of 'course_catalogs' as a DataFrame (struct='df') or dictionary
+                   (struct='dict')
+
+        'campus': If given, only the courses of this campus are used
+
+        'default_credits': Credits of courses whose 'Credits' do not list a number
+
+    Courses listed as requisites but missing from the catalog cannot be planned, they
+    are assumed to be met and listed in the 'Assumed' entry of the plan.
+    """
+
+    def __init__(self, catalog, campus=None, default_credits=5):
+        if not isinstance(catalog, pd.DataFrame):
+            catalog = pd.DataFrame.from_dict(catalog, orient='index')
+        if campus is not None:
+            catalog = catalog[catalog['Campus'] == campus.title()]
+
+        self.ids = []
+        self.index = {}
+        rows = []
+        for course_id, row in zip(catalog.index, catalog.to_dict(orient='records')):
+            key = course_key(course_id)
+            if key and key not in self.index:
+                self.index[key] = len(self.ids)
+                self.ids.append(key)
+                rows.append(row)
+
+        self.credits = [parse_credits(row.get('Credits'), default_credits) for row in rows]
+        self.offered = [offered_mask(row.get('Quarters Offered')) for row in rows]
+        self.unknown = {}
+        # Every requisite is a list of groups, each group a list of alternatives and each
+        # alternative a list of bitsets, one of whose courses must be taken
+        self.prerequisites = [self.compile(row.get('Prerequisites'), i) for i, row in enumerate(rows)]
+        self.corequisites = [self.compile(row.get('Co-Requisites'), i) for i, row in enumerate(rows)]
+        self.depths = {}
+
+    def compile(self, requisites, course):
+        groups = []
+        for group in filter(None, (requisites or '').split(';')):
+            alternatives = []
+            for alternative in filter(None, group.split(',')):
+                masks = []
+                for options in filter(None, alternative.split('&&')):
+                    mask = 0
+                    for option in options.split('/'):
+                        key = course_key(option)
+                        if key in self.index:
+                            mask |= 1 << self.index[key]
+                        elif key and key != 'POI':
+                            self.unknown.setdefault(course, set()).add(key)
+                    if mask:
+                        masks.append(mask)
+                # Alternatives of unknown courses only are met, so the group is met
+                if not masks:
+                    alternatives = []
+                    break
+                alternatives.append(masks)
+            if alternatives:
+                groups.append(alternatives)
+        return groups
+
+    def courses(self, mask):
+        """ Returns the Course IDs in a bitset """
+        return [self.ids[c] for c in self.indices(mask)]
+
+    def mask(self, courses):
+        """ Returns the bitset of the given Course IDs, raising a KeyError for unknown courses """
+        mask = 0
+        for course in courses:
+            key = course_key(course)
+            if key not in self.index:
+                raise KeyError(f'{course} is not in the catalog')
+            mask |= 1 << self.index[key]
+        return mask
+
+    @staticmethod
+    def met(groups, taken):
+        """ Returns True if every group of the requisites is met by the 'taken' bitset """
+        return all(any(all(taken & m for m in masks) for masks in alternatives) for alternatives in groups)
+
+    def depth(self, course):
+        """
+        Returns
+
+            The number of quarters needed to take 'course' from scratch when only the
+            prerequisites are considered (1 for a course without prerequisites), or None
+            if its prerequisites form a cycle
+        """
+        return self.search_depth(course, frozenset())[0]
+
+    def search_depth(self, course, visiting):
+        """
+        Returns
+
+            The depth of 'course' and whether a prerequisite cycle was cut while computing
+            it. Depths computed with a cut cycle depend on the course the search started
+            from, so only those computed without one are cached.
+        """
+        if course in self.depths:
+            return self.depths[course], False
+        if course in visiting:
+            return None, True
+        visiting = visiting | {course}
+        depth, cut = 1, False
+        for alternatives in self.prerequisites[course]:
+            best = None
+            for masks in alternatives:
+                needed, alternative_cut = self.alternative_depth(masks, visiting)
+                cut = cut or alternative_cut
+                if needed is not None and (best is None or needed < best):
+                    best = needed
+            if best is None:
+                return None, cut
+            depth = max(depth, best + 1)
+        if not cut:
+            self.depths[course] = depth
+        return depth, cut
+
+    def alternative_depth(self, masks, visiting):
+        deepest, cut = 0, False
+        for mask in masks:
+            depths = []
+            for c in self.indices(mask):
+                depth, course_cut = self.search_depth(c, visiting)
+                cut = cut or course_cut
+                if depth is not None:
+                    depths.append(depth)
+            if not depths:
+                return None, cut
+            deepest = max(deepest, min(depths))
+        return deepest, cut
+
+    @staticmethod
+    def indices(mask):
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def choose(self, masks, completed):
+        """ Picks the quickest course of every bitset of an alternative that is not yet completed """
+        chosen = []
+        for mask in masks:
+            if mask & completed:
+                continue
+            options = [(self.depth(c), c) for c in self.indices(mask) if self.depth(c) is not None]
+            if not options:
+                return None
+            chosen.append(min(options)[1])
+        return chosen
+
+    def requirements(self, targets, completed=()):
+        """
+        Finds every course that has to be taken to reach the targets
+
+        @params
+
+            'targets': Course IDs to take, i.e. ['CSE 332', 'MATH308']
+
+            'completed': Course IDs that were already taken
+
+        Returns
+
+            A bitset of the courses to take. For requisites with alternatives, the
+            alternative needing the fewest quarters is chosen.
+        """
+        completed = self.mask(completed)
+        required = 0
+        pending = list(self.indices(self.mask(targets) & ~completed))
+        while pending:
+            course = pending.pop()
+            if required >> course & 1:
+                continue
+            required |= 1 << course
+            for alternatives in self.prerequisites[course] + self.corequisites[course]:
+                met = completed | required
+                if any(all(met & m for m in masks) for masks in alternatives):
+                    continue
+                options = []
+                for masks in alternatives:
+                    chosen = self.choose(masks, met)
+                    if chosen is not None:
+                        options.append((max([self.depth(c) for c in chosen] or [0]), len(chosen), chosen))
+                if not options:
+                    raise ValueError(f'The requisites of {self.ids[course]} cannot be met')
+                pending.extend(min(options)[2])
+        return required
+
+    def with_corequisites(self, course, taken, selected, available):
+        """
+        Returns
+
+            The bitset of 'course' and the available courses needed to meet its
+            co-requisites in the same quarter, or None if they cannot be met
+        """
+        added = 1 << course
+        for alternatives in self.corequisites[course]:
+            met = taken | selected | added
+            if any(all(met & m for m in masks) for masks in alternatives):
+                continue
+            for masks in alternatives:
+                # Take one available course of every bitset the alternative still misses
+                picks = [mask & available for mask in masks if not mask & met]
+                if all(picks):
+                    for pick in picks:
+                        added |= pick & -pick
+                    break
+            else:
+                return None
+        # The co-requisites added for 'course' must have theirs met as well
+        met = taken | selected | added
+        if all(self.met(self.corequisites[c], met) for c in self.indices(added)):
+            return added
+        return None
+
+    def plan(self, targets, completed=(), start=None, max_credits=15, summer=False,
+             max_quarters=40, struct='dict'):
+        """
+        Plans the quarters in which to take the targets and all the courses they require
+
+        @params
+
+            'targets': Course IDs to take, i.e. ['CSE 332', 'MATH308']
+
+            'completed': Course IDs that were already taken
+
+            'start': (year, quarter) of the first quarter of the plan, i.e. (2024, 'AUT').
+                     Defaults to the quarter after the current one.
+
+            'max_credits': Maximum credits per quarter. A course with more credits than
+                           this is taken on its own.
+
+            'summer': If True, summer quarters are planned as well
+
+            'max_quarters': Quarters after which planning stops with a ValueError
+
+            'struct': 'dict' -> A dictionary with the 'Quarters' list of the plan, each with
+                                its 'Year', 'Quarter', 'Courses' and 'Credits', and the
+                                'Assumed' courses missing from the catalog
+                      'df' -> Pandas DataFrame with one row per planned course
+
+        Returns
+
+            A plan in which every course comes after its prerequisites, with its
+            co-requisites taken before or in the same quarter, in a quarter it is offered.
+            Quarters are filled greedily, courses on the longest prerequisite chains
+            first. This usually gives a short plan, but it is a heuristic and the plan
+            is not guaranteed to take the fewest possible quarters.
+        """
+        assert struct in ['dict', 'df'], f'{struct} is not a valid argument for "struct"'
+        if start is None:
+            start = next_quarter(*current_quarter())
+        assert start[1] in QUARTERS, f'{start[1]} is not a valid quarter'
+        taken = self.mask(completed)
+        required = self.requirements(targets, completed)
+        remaining = required
+
+        # Priority of each course: the longest chain of required courses that depend on it
+        dependents = {c: [] for c in self.indices(required)}
+        for course in dependents:
+            for alternatives in self.prerequisites[course]:
+                for masks in alternatives:
+                    for mask in masks:
+                        for prerequisite in self.indices(mask & required):
+                            dependents[prerequisite].append(course)
+        height = {}
+
+        def chain(course, visiting=frozenset()):
+            if course not in height:
+                after = [chain(d, visiting | {course}) for d in dependents[course] if d not in visiting]
+                height[course] = 1 + max(after, default=0)
+            return height[course]
+
+        order = sorted(dependents, key=lambda c: (-chain(c), self.ids[c]))
+
+        quarters = []
+        year, quarter = start
+        idle = 0
+        while remaining:
+            if len(quarters) >= max_quarters or idle >= len(QUARTERS):
+                raise ValueError('Could not plan ' + ', '.join(self.courses(remaining)))
+            if quarter == 'SUM' and not summer:
+                year, quarter = next_quarter(year, quarter)
+                continue
+            season = 1 << QUARTERS.index(quarter)
+            selected, credits = 0, 0
+            available = 0
+            for course in order:
+                if remaining >> course & 1 and self.offered[course] & season \
+                        and self.met(self.prerequisites[course], taken):
+                    available |= 1 << course
+            # Courses whose co-requisites are selected later in the same quarter are
+            # reconsidered until nothing else can be added
+            changed = True
+            while changed:
+                changed = False
+                for course in order:
+                    if not available >> course & 1 or selected >> course & 1:
+                        continue
+                    added = self.with_corequisites(course, taken, selected, available)
+                    if added is None:
+                        continue
+                    added_credits = sum(self.credits[c] for c in self.indices(added))
+                    if credits and credits + added_credits > max_credits:
+                        continue
+                    selected |= added
+                    credits += added_credits
+                    changed = True
+            if selected:
+                quarters.append({'Year': year, 'Quarter': quarter, 'Courses': self.courses(selected),
+                                 'Credits': credits})
+                taken |= selected
+                remaining &= ~selected
+                idle = 0
+            else:
+                idle += 1
+            year, quarter = next_quarter(year, quarter)
+
+        assumed = sorted({key for c in self.indices(required) for key in self.unknown.get(c, ())})
+        if struct == 'df':
+            rows = [[q['Year'], q['Quarter'], course, self.credits[self.index[course]]]
+                    for q in quarters for course in q['Courses']]
+            df = pd.DataFrame(rows, columns=['Year', 'Quarter', 'Course ID', 'Credits'])
+            df.attrs['Assumed'] = assumed
+            return df
+        return {'Quarters': quarters, 'Assumed': assumed}
@@ -0,0 +1,219 @@
+"""
+Resolves building codes and names, as found in the Time Schedules, 'buildings()' and the
+packaged building coordinates, to one canonical building record with its coordinates.
+
+Every code and name is normalized into an alias table for exact lookups. Names that are
+not in the table are matched through a trigram index, which only scores the aliases
+sharing a trigram with the name instead of comparing it with every building.
+"""
+
+import re
+from unicodedata import normalize
+import pandas as pd
+from .parse_buildings import load_coordinates
+
+# Columns of a building record
+RECORD_KEYS = ['Campus', 'Building', 'Name', 'Latitude', 'Longitude']
+
+word_re = re.compile(r'[A-Z0-9]+')
+formerly_re = re.compile(r'\((?:formerly|previously|aka)\s+([^)]+)\)', re.IGNORECASE)
+parenthesis_re = re.compile(r'\([^)]*\)')
+
+
+def normalize_name(name):
+    """
+    Normalizes a building code or name for lookups, i.e. 'Mary Gates Hall & Annex'
+    -> 'MARY GATES HALL AND ANNEX'
+    """
+    if not isinstance(name, str):
+        return ''
+    name = normalize('NFKD', name).upper().replace('&', ' AND ')
+    return ' '.join(w for w in word_re.findall(name) if w != 'THE')
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BuildingResolver:
+    """
+    Precomputed alias table and trigram index of the UW buildings
+
+    @params
+
+        'names': Optional output of 'buildings()' (Building Abbreviation -> Full Name),
+                 adding the names of buildings without packaged coordinates
+
+        'schedules': Optional output of 'time_schedules' (DataFrame or records). Its
+                     (Campus, Building) codes are added as buildings, so codes without
+                     coordinates still resolve to themselves.
+
+        'aliases': Optional dictionary of extra alias -> building code, i.e.
+                   {'Gates Center': 'CSE2'}, or (campus, alias) -> building code
+
+        'threshold': Lowest trigram similarity (0 to 1) of a fuzzy match
+    """
+
+    def __init__(self, names=None, schedules=None, aliases=None, threshold=0.5):
+        self.threshold = threshold
+        self.records = []
+        self.codes = {}
+        self.aliases = {}
+        self.postings = {}
+        self.alias_trigrams = {}
+
+        for campus, buildings in load_coordinates().items():
+            for code, coords in buildings.items():
+                latitude = float(coords['Latitude']) if coords['Latitude'] else None
+                longitude = float(coords['Longitude']) if coords['Longitude'] else None
+                self.add_record(campus, code, coords.get('Name') or None, latitude, longitude)
+
+        for code, name in (names or {}).items():
+            ids = self.codes.get((None, normalize_name(code)), [])
+            if ids:
+                for i in ids:
+                    if not self.records[i]['Name']:
+                        self.records[i]['Name'] = name
+                    self.add_alias(i, name)
+            else:
+                self.add_record(None, code, name, None, None)
+
+        if schedules is not None:
+            if not isinstance(schedules, pd.DataFrame):
+                schedules = pd.DataFrame(list(schedules))
+            for campus, code in set(zip(schedules['Campus'], schedules['Building'])):
+                if isinstance(code, str) and code and (campus, normalize_name(code)) not in self.codes:
+                    self.add_record(campus, code, None, None, None)
+
+        for alias, code in (aliases or {}).items():
+            campus, alias = alias if type(alias) == tuple else (None, alias)
+            for i in self.codes.get((campus, normalize_name(code)), []):
+                self.add_alias(i, alias)
+
+        # The trigram index is built once every alias is known
+        for key in self.aliases:
+            if key[0] is None:
+                grams = trigrams(key[1])
+                self.alias_trigrams[key[1]] = len(grams)
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(key[1])
+
+    def add_record(self, campus, code, name, latitude, longitude):
+        record = {'Campus': campus, 'Building': code, 'Name': name,
+                  'Latitude': latitude, 'Longitude': longitude}
+        record_id = len(self.records)
+        self.records.append(record)
+        for scope in {campus, None}:
+            self.codes.setdefault((scope, normalize_name(code)), []).append(record_id)
+        self.add_alias(record_id, code)
+        if name:
+            self.add_alias(record_id, name)
+
+    def add_alias(self, record_id, alias):
+        campus = self.records[record_id]['Campus']
+        names = [alias]
+        if isinstance(alias, str):
+            # 'John M. Wallace Hall (formerly Academic Computing Center)' is known by both names
+            names += formerly_re.findall(alias) + [parenthesis_re.sub('', alias)]
+        for name in names:
+            key = normalize_name(name)
+            if key:
+                for scope in {campus, None}:
+                    ids = self.aliases.setdefault((scope, key), [])
+                    if record_id not in ids:
+                        ids.append(record_id)
+
+    def lookup(self, key, campus):
+        """ Returns the record ids of an exact alias, those of 'campus' first """
+        ids = self.aliases.get((campus, key)) if campus is not None else None
+        return ids or self.aliases.get((None, key), [])
+
+    def resolve(self, name, campus=None):
+        """
+        Resolves a building code or name
+
+        @params
+
+            'name': i.e. 'MGH', 'Mary Gates Hall' or 'mary gates'
+
+            'campus': Optional campus the building is on, preferred when names collide
+
+        Returns
+
+            A (record, score) tuple with the building record ('Campus', 'Building', 'Name',
+            'Latitude', 'Longitude') and the similarity of the match (1 for exact
+            aliases), or (None, 0) if nothing is similar enough
+        """
+        key = normalize_name(name)
+        if not key:
+            return None, 0
+        ids = self.lookup(key, campus)
+        if ids:
+            return dict(self.records[self.best(ids, campus)]), 1.0
+
+        # Count the trigrams each alias shares with the name, only aliases in the
+        # postings of the name's trigrams are visited
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for alias in self.postings.get(gram, ()):
+                shared[alias] = shared.get(alias, 0) + 1
+        best, best_score = None, 0
+        for alias, count in shared.items():
+            score = 2 * count / (len(grams) + self.alias_trigrams[alias])
+            # Aliases of another campus lose ties against those of 'campus'
+            if campus is not None and all(self.records[i]['Campus'] not in (campus, None)
+                                          for i in self.aliases[(None, alias)]):
+                score *= 0.99
+            if score > best_score or (score == best_score and alias < best):
+                best, best_score = alias, score
+        if best is None or best_score < self.threshold:
+            return None, 0
+        return dict(self.records[self.best(self.lookup(best, campus), campus)]), best_score
+
+    def best(self, ids, campus):
+        """ Picks the record of 'campus' with coordinates when several share an alias """
+        return min(ids, key=lambda i: (campus is not None and self.records[i]['Campus'] != campus,
+                                       self.records[i]['Latitude'] is None, i))
+
+    def resolve_many(self, names, campuses=None, struct='df'):
+        """
+        Resolves a whole column of building codes or names, i.e. the 'Building' column of
+        'time_schedules'. Each distinct (campus, name) pair is only resolved once.
+
+        @params
+
+            'names': The building codes or names
+
+            'campuses': Optional campus of each name (i.e. the 'Campus' column), or one
+                        campus for every name
+
+            'struct': 'df' -> Pandas DataFrame aligned with 'names'
+                      'list' -> List of (record, score) tuples
+
+        Returns
+
+            The 'Campus', 'Building', 'Name', 'Latitude', 'Longitude' and 'Score' of the
+            building each name resolves to, empty where nothing matched
+        """
+        assert struct in ['df', 'list'], f'{struct} is not a valid argument for "struct"'
+        index = names.index if isinstance(names, pd.Series) else None
+        names = list(names)
+        if campuses is None or isinstance(campuses, str):
+            campuses = [campuses] * len(names)
+        resolved = {}
+        results = []
+        for name, campus in zip(names, campuses):
+            key = (campus, name)
+            if key not in resolved:
+                resolved[key] = self.resolve(name, campus)
+            results.append(resolved[key])
+        if struct == 'list':
+            return results
+        empty = dict.fromkeys(RECORD_KEYS)
+        df = pd.DataFrame([record or empty for record, _ in results], columns=RECORD_KEYS)
+        df['Score'] = [score for _, score in results]
+        if index is not None:
+            df.index = index
+        return df
@@ -0,0 +1,197 @@
+"""Room occupancy of the UW Time Schedules as a rooms x weekdays x 10-minute slots boolean array"""
+
+import re, datetime
+import numpy as np
+import pandas as pd
+from .parse_schedules import to_time
+
+DAYS = ['M', 'T', 'W', 'Th', 'F', 'Sa', 'Su']
+days_re = re.compile(r'Th|Sa|Su|M|T|W|F')
+
+# Length of one time slot in minutes, and the number of slots in a day
+SLOT_MINUTES = 10
+SLOTS = 24 * 60 // SLOT_MINUTES
+
+
+def to_minutes(value):
+    """
+    Converts a time of day to minutes after midnight
+
+    @params
+
+        'value': A datetime.time, a 'HH:MM' or 'HH:MM:SS' string, or minutes as an int
+
+    Returns
+
+        Minutes after midnight
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (datetime.time, datetime.datetime)):
+        return value.hour * 60 + value.minute
+    hours, minutes = str(value).split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def to_slot(value, ceil=False):
+    minutes = to_minutes(value)
+    slot = minutes // SLOT_MINUTES
+    if ceil and minutes % SLOT_MINUTES:
+        slot += 1
+    return min(max(slot, 0), SLOTS)
+
+
+def slot_time(slot):
+    minutes = slot * SLOT_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class RoomOccupancy:
+    """
+    Precomputed occupancy of every room in the given Time Schedules
+
+    @params
+
+        'schedules': Output of 'time_schedules' as a pandas DataFrame or a list of
+                     records (struct='dict'). The 'Building', 'Room Number', 'Days' and
+                     'Time' columns are used.
+    """
+
+    def __init__(self, schedules):
+        if not isinstance(schedules, pd.DataFrame):
+            schedules = pd.DataFrame(list(schedules))
+        for column in ['Building', 'Room Number', 'Days', 'Time']:
+            if column not in schedules.columns:
+                raise ValueError(f'"schedules" is missing the "{column}" column')
+
+        schedules = schedules[(schedules['Building'].fillna('') != '') & (schedules['Room Number'].fillna('') != '')]
+        # Times repeat across thousands of sections, each distinct time is only converted once
+        slots = {}
+        for t in schedules['Time'].dropna().unique():
+            times = to_time(t)
+            if times:
+                start, end = to_slot(times[0]), to_slot(times[1], ceil=True)
+                if end > start:
+                    slots[t] = (start, end)
+
+        rows, days, starts, ends = [], [], [], []
+        day_index = {d: i for i, d in enumerate(DAYS)}
+        for row, (meeting_days, t) in enumerate(zip(schedules['Days'], schedules['Time'])):
+            if t not in slots or not isinstance(meeting_days, str):
+                continue
+            start, end = slots[t]
+            for day in days_re.findall(meeting_days):
+                rows.append(row)
+                days.append(day_index[day])
+                starts.append(start)
+                ends.append(end)
+
+        codes, rooms = pd.factorize(pd.Series(list(zip(schedules['Building'], schedules['Room Number'])), dtype=object))
+        self.rooms = pd.MultiIndex.from_arrays([[r[0] for r in rooms], [r[1] for r in rooms]],
+                                               names=['Building', 'Room Number'])
+        room_codes = codes[np.asarray(rows, dtype=np.intp)]
+        days = np.asarray(days, dtype=np.intp)
+
+        # Mark each meeting as +1 at its first slot and -1 after its last, the running
+        # sum along the slots is then the number of sections in the room at each slot
+        counts = np.zeros((len(self.rooms), len(DAYS), SLOTS + 1), dtype=np.int16)
+        np.add.at(counts, (room_codes, days, np.asarray(starts, dtype=np.intp)), 1)
+        np.add.at(counts, (room_codes, days, np.asarray(ends, dtype=np.intp)), -1)
+        self.occupied = np.cumsum(counts, axis=2)[:, :, :SLOTS] > 0
+        self.buildings = pd.Index(self.rooms.get_level_values('Building'))
+
+    def _select(self, building):
+        if building is None:
+            return np.ones(len(self.rooms), dtype=bool)
+        if type(building) == str:
+            building = [building]
+        return self.buildings.isin(building)
+
+    @staticmethod
+    def _days(days):
+        if days is None:
+            return list(range(5))
+        if type(days) == str:
+            found = days_re.findall(days)
+            # Every character must belong to a day, so typos do not silently drop days
+            if not found or ''.join(found) != days:
+                raise ValueError(f'{days!r} is not a valid day string, use i.e. "MWF" or "TTh"')
+            days = found
+        invalid = [d for d in days if d not in DAYS]
+        if invalid:
+            raise ValueError(f'{invalid} are not valid days, valid days are {DAYS}')
+        return [DAYS.index(d) for d in days]
+
+    def free_rooms(self, days, start, end, building=None):
+        """
+        Finds the rooms that are free for the whole given time range
+
+        @params
+
+            'days': Day or days in Time Schedule notation, i.e. 'T' or 'MWF'
+
+            'start': Start of the time range, i.e. '14:00'
+
+            'end': End of the time range, i.e. '16:00'
+
+            'building': Optional building code or list of codes to search in
+
+        Returns
+
+            A list of (Building, Room Number) tuples
+        """
+        window = self.occupied[:, self._days(days), to_slot(start):to_slot(end, ceil=True)]
+        free = ~window.any(axis=(1, 2)) & self._select(building)
+        return list(self.rooms[free])
+
+    def is_free(self, building, room, days, start, end):
+        """
+        Returns
+
+            True if the given room is free for the whole given time range
+        """
+        return (building, room) in set(self.free_rooms(days, start, end, building))
+
+    def utilization(self, building=None, days=None, start='08:00', end='18:00'):
+        """
+        Percentage of the given time range each room is in use
+
+        @params
+
+            'building': Optional building code or list of codes
+
+            'days': Days to include, defaults to 'MTWThF'
+
+            'start', 'end': The time range of each day to include
+
+        Returns
+
+            A pandas Series indexed by (Building, Room Number)
+        """
+        selected = self._select(building)
+        window = self.occupied[selected][:, self._days(days), to_slot(start):to_slot(end, ceil=True)]
+        used = window.reshape(len(window), -1).mean(axis=1) * 100 if window.size else np.zeros(len(window))
+        return pd.Series(used, index=self.rooms[selected], name='Utilization')
+
+    def peak_hours(self, building=None, days=None, top=None):
+        """
+        Number of rooms in use at each time slot
+
+        @params
+
+            'building': Optional building code or list of codes
+
+            'days': Days to include, defaults to 'MTWThF'. Counts are summed over the days.
+
+            'top': If given, only the 'top' busiest slots are returned
+
+        Returns
+
+            A pandas Series indexed by the start time of each slot ('HH:MM'), busiest first
+            if 'top' is given
+        """
+        in_use = self.occupied[self._select(building)][:, self._days(days), :].sum(axis=(0, 1))
+        peaks = pd.Series(in_use, index=[slot_time(s) for s in range(SLOTS)], name='Rooms in use')
+        if top is not None:
+            peaks = peaks.sort_values(ascending=False, kind='stable').head(top)
+        return peaks
@@ -0,0 +1,224 @@
+"""Ranked full-text search over the UW Course Catalogs"""
+
+import re, json, math
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from zlib import compress, decompress
+
+token_re = re.compile(r'[a-z0-9&]+')
+department_re = re.compile(r'[a-z&]+')
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it',
+    'of', 'on', 'or', 'such', 'that', 'the', 'their', 'this', 'to', 'with'
+])
+
+# Columns of the course catalog that are searched and how much a match in each counts
+FIELD_WEIGHTS = {'Course Name': 3, 'Areas of Knowledge': 2, 'Description': 1}
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase search terms
+
+    @params
+
+        'text': The text to tokenize
+
+    Returns
+
+        A list of terms with stop words removed
+    """
+    return [t for t in token_re.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class CatalogIndex:
+    """
+    Inverted index with BM25 ranking built from the output of 'course_catalogs'
+
+    @params
+
+        'catalog': The course catalog as a pandas DataFrame (struct='df') or
+                   a Python Dictionary (struct='dict')
+
+        'k1', 'b': BM25 parameters
+    """
+
+    def __init__(self, catalog=None, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        # Per document: Course ID, Campus, Department Name, Areas of Knowledge
+        self.courses = []
+        self.lengths = array('I')
+        # Term -> (document ids, term frequencies)
+        self.postings = {}
+        if catalog is not None:
+            self.build(catalog)
+
+    def build(self, catalog):
+        """
+        Indexes every course in the given course catalog
+
+        @params
+
+            'catalog': The course catalog as a pandas DataFrame or Python Dictionary
+        """
+        if not isinstance(catalog, dict):
+            catalog = catalog.to_dict(orient='index')
+        postings = defaultdict(lambda: (array('I'), array('I')))
+        courses, lengths = [], array('I')
+        for doc, (course_id, course) in enumerate(catalog.items()):
+            courses.append((course_id, course['Campus'], course['Department Name'],
+                            course['Areas of Knowledge']))
+            terms = Counter()
+            # The Course ID (i.e. 'cse142') is searchable as well, and so are its
+            # department and number on their own (i.e. 'cse' and '142')
+            for term in (str(course_id).lower(), course['Department Name'].replace(' ', '').lower(),
+                         str(course['Course Number']).lower()):
+                terms[term] += FIELD_WEIGHTS['Course Name']
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(course[field] or ''):
+                    terms[term] += weight
+            lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                docs, tfs = postings[term]
+                docs.append(doc)
+                tfs.append(tf)
+        self.courses = courses
+        self.lengths = lengths
+        self.postings = dict(postings)
+        self._prepare()
+
+    def _prepare(self):
+        """ Computes the values derived from the postings used at query time """
+        self.vocabulary = sorted(self.postings)
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        self.campuses = defaultdict(set)
+        self.departments = defaultdict(set)
+        self.credit_types = defaultdict(set)
+        for doc, (_, campus, department, areas) in enumerate(self.courses):
+            self.campuses[campus.title()].add(doc)
+            self.departments[department.replace(' ', '').upper()].add(doc)
+            for area in filter(None, areas.split(',')):
+                self.credit_types[area.strip()].add(doc)
+
+    def _expand(self, term):
+        """ Returns all terms in the vocabulary starting with 'term' """
+        start = bisect_left(self.vocabulary, term)
+        terms = []
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            terms.append(word)
+        return terms
+
+    def _allowed(self, values, groups, normalize):
+        if values is None:
+            return None
+        if type(values) == str:
+            values = [values]
+        return set().union(*(groups.get(normalize(v), set()) for v in values))
+
+    def search(self, query, campuses=None, departments=None, credit_types=None,
+               limit=10, prefix=True):
+        """
+        Finds the courses best matching the given query
+
+        @params
+
+            'query': The text to search for
+
+            'campuses': Campus or list of campuses to restrict results to
+
+            'departments': Department abbreviation or list of abbreviations (i.e. 'CSE')
+                           to restrict results to
+
+            'credit_types': Areas of Knowledge (I&S, DIV, NW, VLPA, QSR) a course must
+                            have at least one of
+
+            'limit': Maximum number of results returned, None returns every match
+
+            'prefix': If True, the last word of the query also matches every term it is
+                      a prefix of, useful for searching while typing
+
+        Returns
+
+            A list of (Course ID, score) tuples, best matches first
+        """
+        terms = tokenize(query)
+        if not terms or not self.courses:
+            return []
+        allowed = None
+        for subset in (self._allowed(campuses, self.campuses, str.title),
+                       self._allowed(departments, self.departments, lambda d: d.replace(' ', '').upper()),
+                       self._allowed(credit_types, self.credit_types, str.strip)):
+            if subset is not None:
+                allowed = subset if allowed is None else allowed & subset
+
+        query_terms = [[t] for t in terms]
+        if prefix:
+            query_terms[-1] = self._expand(terms[-1]) or [terms[-1]]
+        # A department followed by a number (i.e. 'CSE 142') also matches the Course ID
+        for i in range(len(terms) - 1):
+            if department_re.fullmatch(terms[i]) and terms[i + 1].isdigit():
+                joined = terms[i] + terms[i + 1]
+                last = prefix and i + 2 == len(terms)
+                query_terms.append((self._expand(joined) if last else None) or [joined])
+
+        n, k1, b = len(self.courses), self.k1, self.b
+        average_length, lengths = self.average_length or 1, self.lengths
+        scores = defaultdict(float)
+        for options in query_terms:
+            for term in options:
+                if term not in self.postings:
+                    continue
+                docs, tfs = self.postings[term]
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc, tf in zip(docs, tfs):
+                    if allowed is not None and doc not in allowed:
+                        continue
+                    norm = k1 * (1 - b + b * lengths[doc] / average_length)
+                    scores[doc] += idf * tf * (k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.courses[doc][0], score) for doc, score in ranked]
+
+    def save(self, path):
+        """
+        Stores the index in a zlib compressed file
+
+        @params
+
+            'path': The file to write the index to
+        """
+        data = {
+            'k1': self.k1, 'b': self.b, 'courses': self.courses, 'lengths': self.lengths.tolist(),
+            'postings': {t: [d.tolist(), f.tolist()] for t, (d, f) in self.postings.items()}
+        }
+        with open(path, mode='wb') as f:
+            f.write(compress(json.dumps(data).encode()))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index stored with 'save'
+
+        @params
+
+            'path': The file the index was written to
+
+        Returns
+
+            The loaded CatalogIndex
+        """
+        with open(path, mode='rb') as f:
+            data = json.loads(decompress(f.read()))
+        index = cls(k1=data['k1'], b=data['b'])
+        index.courses = [tuple(c) for c in data['courses']]
+        index.lengths = array('I', data['lengths'])
+        index.postings = {t: (array('I', d), array('I', f)) for t, (d, f) in data['postings'].items()}
+        index._prepare()
+        return index
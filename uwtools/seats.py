@@ -0,0 +1,292 @@
+"""
+Polls the UW Time Schedules and records how the seats of every section (SLN) fill up over time.
+Only changes are stored, delta encoded in compact arrays.
+"""
+
+import json, time, threading
+from array import array
+from zlib import compress, decompress
+import concurrent.futures as cf
+from . import fetch
+from .parse_schedules import plan_departments, parse_schedule_page
+
+
+class SeatSeries:
+    """
+    Time series of the (enrolled, limit) values of one section. A point is only added when
+    either value changes, and every point is stored as the difference to the previous one.
+    """
+    __slots__ = ('times', 'enrolled', 'limits', 'last')
+
+    def __init__(self):
+        self.times = array('q')
+        self.enrolled = array('i')
+        self.limits = array('i')
+        # Last absolute (time, enrolled, limit) point, the base of the next delta
+        self.last = (0, 0, 0)
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, timestamp, enrolled, limit):
+        """
+        Records an observation of the section
+
+        @params
+
+            'timestamp': Time of the observation in seconds since the epoch
+
+            'enrolled': Number of students enrolled in the section
+
+            'limit': Enrollment limit of the section
+
+        Returns
+
+            True if the observation changed the series, False if it was a repeat
+        """
+        t, e, l = self.last
+        if self.times and enrolled == e and limit == l:
+            return False
+        timestamp = int(timestamp)
+        self.times.append(timestamp - t)
+        self.enrolled.append(enrolled - e)
+        self.limits.append(limit - l)
+        self.last = (timestamp, enrolled, limit)
+        return True
+
+    def points(self):
+        """
+        Returns
+
+            A list of (time, enrolled, limit) tuples, one for each change
+        """
+        t = e = l = 0
+        points = []
+        for dt, de, dl in zip(self.times, self.enrolled, self.limits):
+            t, e, l = t + dt, e + de, l + dl
+            points.append((t, e, l))
+        return points
+
+    def to_list(self):
+        return [self.times.tolist(), self.enrolled.tolist(), self.limits.tolist()]
+
+    @classmethod
+    def from_list(cls, data):
+        series = cls()
+        series.times, series.enrolled, series.limits = \
+            array('q', data[0]), array('i', data[1]), array('i', data[2])
+        if series.times:
+            series.last = series.points()[-1]
+        return series
+
+
+class SeatPoller:
+    """
+    Polls every department Time Schedule page of a campus for a quarter and records the
+    enrollment of each section in a SeatSeries.
+
+    Departments whose enrollment changed since their last poll are polled again after
+    'hot_interval' seconds. Each poll without a change doubles the department's interval,
+    up to 'cold_interval' seconds, so busy departments are polled far more often than
+    quiet ones. A department whose page fails to load is retried after 'hot_interval'
+    seconds, doubled for every further failure in a row up to 'cold_interval' seconds.
+
+    @params
+
+        'campus': The campus to poll
+
+        'year': The year of the Time Schedules to poll
+
+        'quarter': The quarter of the Time Schedules to poll ('AUT', 'WIN', 'SPR' or 'SUM')
+
+        'hot_interval': Seconds between polls of a department that is changing
+
+        'cold_interval': Maximum number of seconds between polls of a department
+
+        'links': Optional dict with the 'link' and 'schedule' websites to poll instead of
+                 the UW Time Schedules. A local stand-in server, such as
+                 'python -m http.server' over a directory of saved pages, is enough.
+
+        'max_workers': Maximum number of department pages downloaded at the same time
+    """
+
+    def __init__(self, campus, year, quarter, hot_interval=60, cold_interval=1800,
+                 links=None, max_workers=8):
+        assert hot_interval > 0 and cold_interval >= hot_interval, 'Invalid polling intervals'
+        self.campus = campus.title()
+        self.year = int(year)
+        self.quarter = quarter
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.links = links
+        self.max_workers = max_workers
+        # SLN -> SeatSeries
+        self.series = {}
+        # Department schedule website -> [department, interval, next poll time, failures in a row]
+        self.departments = {}
+        # Department schedule website -> last failure (see 'fetch.failure'), while it keeps failing
+        self.failures = {}
+        # Error that stopped the background thread, raised again by 'stop'
+        self.error = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def plan(self):
+        """
+        Finds the department pages to poll. All departments start out hot.
+
+        Returns
+
+            The number of departments found
+        """
+        plan = plan_departments(self.campus, self.year, self.quarter, self.links)
+        if plan is None:
+            raise ValueError(f'The {self.quarter} {self.year} Time Schedules for {self.campus} are not available')
+        now = time.time()
+        with self.lock:
+            for department, link in plan:
+                self.departments.setdefault(link, [department, self.hot_interval, now, 0])
+        return len(self.departments)
+
+    def poll_department(self, link):
+        """
+        Polls one department page and records every changed section
+
+        @params
+
+            'link': The department schedule website
+
+        Returns
+
+            The number of sections whose enrollment changed
+        """
+        enrollment = {}
+        # Error pages would be parsed as a department without sections
+        parse_schedule_page(fetch.check(fetch.get(link)).text, enrollment)
+        now = time.time()
+        changed = 0
+        with self.lock:
+            for sln, (enrolled, limit) in enrollment.items():
+                series = self.series.get(sln)
+                if series is None:
+                    series = self.series[sln] = SeatSeries()
+                changed += series.append(now, enrolled, limit)
+            schedule = self.departments[link]
+            schedule[1] = self.hot_interval if changed else min(schedule[1] * 2, self.cold_interval)
+            schedule[2] = now + schedule[1]
+            schedule[3] = 0
+            self.failures.pop(link, None)
+        return changed
+
+    def poll_failed(self, link, error):
+        """ Records a failed poll and backs off the department's next poll """
+        now = time.time()
+        with self.lock:
+            schedule = self.departments[link]
+            schedule[3] += 1
+            backoff = min(self.hot_interval * 2 ** (schedule[3] - 1), self.cold_interval)
+            schedule[2] = now + backoff
+            self.failures[link] = fetch.failure(self.campus, schedule[0], link, error)
+
+    def poll_once(self, now=None):
+        """
+        Polls every department that is due
+
+        @params
+
+            'now': The current time, defaults to time.time()
+
+        Returns
+
+            The number of sections whose enrollment changed
+        """
+        if not self.departments:
+            self.plan()
+        now = time.time() if now is None else now
+        with self.lock:
+            due = [link for link, (_, _, next_poll, _) in self.departments.items() if next_poll <= now]
+        changed = 0
+        with cf.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = {executor.submit(self.poll_department, link): link for link in due}
+            for result in cf.as_completed(results):
+                try:
+                    changed += result.result()
+                except Exception as e:
+                    # Failed departments are retried with a growing backoff, see 'failures'
+                    self.poll_failed(results[result], e)
+        return changed
+
+    def run(self, duration=None):
+        """
+        Polls departments as they become due until 'stop' is called
+
+        @params
+
+            'duration': Optional number of seconds after which polling stops
+        """
+        end = None if duration is None else time.time() + duration
+        while not self.stopped.is_set() and (end is None or time.time() < end):
+            self.poll_once()
+            with self.lock:
+                next_poll = min((s[2] for s in self.departments.values()), default=time.time() + self.hot_interval)
+            wait = max(0, next_poll - time.time())
+            if end is not None:
+                wait = min(wait, max(0, end - time.time()))
+            self.stopped.wait(wait)
+
+    def run_background(self):
+        try:
+            self.run()
+        except Exception as e:
+            # Kept for 'stop', since nothing else would see the error of a daemon thread
+            self.error = e
+
+    def start(self):
+        """ Starts polling in a background daemon thread """
+        self.stopped.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self.run_background, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the background polling thread. If polling stopped because of an error (i.e.
+        the Time Schedules are not available), the error is raised here.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def save(self, path):
+        """
+        Stores the recorded series in a zlib compressed file
+
+        @params
+
+            'path': The file to write the series to
+        """
+        with self.lock:
+            data = {
+                'campus': self.campus, 'year': self.year, 'quarter': self.quarter,
+                'series': {sln: series.to_list() for sln, series in self.series.items()}
+            }
+        with open(path, mode='wb') as f:
+            f.write(compress(json.dumps(data).encode()))
+
+    def load(self, path):
+        """
+        Loads series stored with 'save', new observations are appended to them
+
+        @params
+
+            'path': The file the series were written to
+        """
+        with open(path, mode='rb') as f:
+            data = json.loads(decompress(f.read()))
+        with self.lock:
+            self.series.update({sln: SeatSeries.from_list(s) for sln, s in data['series'].items()})
@@ -0,0 +1,297 @@
+"""
+Local HTTP service keeping the Time Schedules, course catalogs, departments and buildings
+of a quarter in memory, refreshed in the background, so many applications can share one
+scraping process:
+
+    uwtools serve --port 8000 --year 2024 --quarter AUT
+
+Every response is JSON:
+
+    /status                             Quarter, load times, sizes and refresh errors
+    /sln/<sln>                          Sections with the given SLN
+    /course/<course>                    Sections and catalog entries of a course (i.e. 'E E 235')
+    /department/<department>            Sections and catalog entries of a department
+    /building/<building>                Sections meeting in a building
+    /room/<building>/<room number>      Sections meeting in a room
+    /departments                        Output of 'departments(struct='dict')'
+    /buildings                          Output of 'buildings()'
+
+Section queries accept '?campus=' to only return sections of one campus.
+"""
+
+import json, time, threading
+import concurrent.futures as cf
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote, parse_qs
+from .parse_schedules import gather, course_key, department_key, current_quarter, latest_quarters
+from .parse_courses import parse_catalogs, get_departments
+from .parse_buildings import get_buildings
+
+CAMPUS_NAMES = ['Seattle', 'Bothell', 'Tacoma']
+# Order of the quarters in a calendar year
+CALENDAR_QUARTERS = ['WIN', 'SPR', 'SUM', 'AUT']
+
+
+class Snapshot:
+    """
+    The data served for one quarter with its lookup indexes. A snapshot is never changed
+    after it is built, a refresh builds a new one and swaps it in.
+
+    @params
+
+        'year', 'quarter': The quarter of the Time Schedules
+
+        'schedules': Time Schedule records (struct='dict')
+
+        'catalog': Course catalog records with their 'Course ID'
+
+        'departments': Output of 'departments(struct='dict')'
+
+        'buildings': Output of 'buildings()'
+    """
+
+    def __init__(self, year, quarter, schedules, catalog, departments, buildings):
+        self.year = year
+        self.quarter = quarter
+        self.schedules = schedules
+        self.catalog = catalog
+        self.departments = departments
+        self.buildings = buildings
+        self.loaded = time.time()
+
+        self.sln, self.course, self.department, self.building, self.room = {}, {}, {}, {}, {}
+        for section in schedules:
+            name = section.get('Course Name') or ''
+            building = (section.get('Building') or '').upper()
+            self.sln.setdefault(str(section.get('SLN')), []).append(section)
+            self.course.setdefault(course_key(name), []).append(section)
+            self.department.setdefault(department_key(name), []).append(section)
+            if building:
+                self.building.setdefault(building, []).append(section)
+                self.room.setdefault((building, (section.get('Room Number') or '').upper()), []).append(section)
+
+        self.catalog_course, self.catalog_department = {}, {}
+        for course in catalog:
+            self.catalog_course.setdefault(course_key(course['Course ID']), []).append(course)
+            self.catalog_department.setdefault(course_key(course['Department Name']), []).append(course)
+
+    def status(self):
+        return {'Year': self.year, 'Quarter': self.quarter, 'Loaded': self.loaded,
+                'Sections': len(self.schedules), 'Courses': len(self.catalog)}
+
+
+class Service:
+    """
+    Loads the data of a quarter, keeps it in memory and refreshes it in the background
+
+    @params
+
+        'year', 'quarter': The quarter to serve. If not given, the latest quarter published
+                           by every campus (see 'latest_quarter') is served and every
+                           refresh moves on to a newly published quarter once its Time
+                           Schedules load.
+
+        'campuses': The Campuses to load
+
+        'refresh': Seconds between background refreshes, None to never refresh
+
+        'use_cache': Passed on to the parsers, so refreshes only parse changed pages
+    """
+
+    def __init__(self, year=None, quarter=None, campuses=CAMPUS_NAMES, refresh=900, use_cache=True):
+        self.follow_latest = year is None or quarter is None
+        if self.follow_latest:
+            year, quarter = current_quarter()
+        self.year = int(year)
+        self.quarter = quarter
+        self.campuses = [c.title() for c in campuses]
+        self.refresh = refresh
+        self.use_cache = use_cache
+        self.snapshot = None
+        self.errors = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def load(self):
+        """
+        Builds a new snapshot and swaps it in. Datasets that fail to load keep their
+        previous contents and the errors are reported by /status.
+
+        Returns
+
+            The new Snapshot
+        """
+        previous = self.snapshot
+        errors = []
+        year, quarter = self.year, self.quarter
+        if self.follow_latest:
+            # The oldest of the campus' latest quarters is published by every campus
+            latest = [q for q in latest_quarters(self.campuses).values() if q is not None]
+            if latest:
+                year, quarter = min(latest, key=lambda q: (q[0], CALENDAR_QUARTERS.index(q[1])))
+
+        def schedules():
+            data, failures = gather(year, quarter, self.campuses, struct='dict',
+                                    use_cache=self.use_cache, partial_ok=True)
+            errors.extend(failures)
+            # A new quarter without any sections is not switched to
+            if not data and (failures or (year, quarter) != (self.year, self.quarter)):
+                raise RuntimeError(f'No Time Schedules could be loaded for {quarter} {year}')
+            return data
+
+        def catalog():
+            data, failures = parse_catalogs(self.campuses, use_cache=self.use_cache, partial_ok=True)
+            errors.extend(failures)
+            return data.reset_index().to_dict(orient='records')
+
+        loaders = {'schedules': schedules, 'catalog': catalog,
+                   'departments': lambda: get_departments(self.campuses, struct='dict'),
+                   'buildings': lambda: get_buildings(self.campuses)}
+        data, failed = {}, set()
+        with cf.ThreadPoolExecutor() as executor:
+            results = {name: executor.submit(loader) for name, loader in loaders.items()}
+        for name, result in results.items():
+            try:
+                data[name] = result.result()
+            except Exception as e:
+                errors.append({'Dataset': name, 'Error': f'{type(e).__name__}: {e}'})
+                failed.add(name)
+                data[name] = getattr(previous, name) if previous is not None else \
+                             ([] if name in ['schedules', 'catalog'] else {})
+
+        if 'schedules' in failed and previous is not None:
+            # The previous Time Schedules are served, so the previous quarter is kept
+            year, quarter = previous.year, previous.quarter
+        snapshot = Snapshot(year, quarter, **data)
+        with self.lock:
+            self.year, self.quarter = year, quarter
+            self.snapshot = snapshot
+            self.errors = errors
+        return snapshot
+
+    def run_refresh(self):
+        while not self.stopped.wait(self.refresh):
+            self.load()
+
+    def start(self):
+        """ Loads the data if needed and starts the background refresh """
+        if self.snapshot is None:
+            self.load()
+        if self.refresh is not None and self.thread is None:
+            self.thread = threading.Thread(target=self.run_refresh, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """ Stops the background refresh """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def query(self, path, params=None):
+        """
+        Answers a query, see the module documentation for the paths
+
+        @params
+
+            'path': The query path, i.e. '/course/CSE 142'
+
+            'params': Dictionary of query parameters, i.e. {'campus': 'Seattle'}
+
+        Returns
+
+            A (HTTP status, JSON serializable result) tuple
+        """
+        params = params or {}
+        snapshot = self.snapshot
+        parts = [unquote(p) for p in path.strip('/').split('/')]
+        kind, args = parts[0], parts[1:]
+        campus = params.get('campus')
+        only_campus = lambda sections: [s for s in sections if campus is None or s.get('Campus') == campus.title()]
+        only_campus_courses = lambda courses: [c for c in courses if campus is None or c.get('Campus') == campus.title()]
+
+        if kind == 'status':
+            with self.lock:
+                return 200, {**snapshot.status(), 'Errors': self.errors}
+        elif kind == 'departments' and not args:
+            return 200, snapshot.departments
+        elif kind == 'buildings' and not args:
+            return 200, snapshot.buildings
+        elif kind == 'sln' and len(args) == 1:
+            return 200, only_campus(snapshot.sln.get(args[0].strip(), []))
+        elif kind == 'course' and len(args) == 1:
+            key = course_key(args[0])
+            return 200, {'Sections': only_campus(snapshot.course.get(key, [])),
+                         'Catalog': only_campus_courses(snapshot.catalog_course.get(key, []))}
+        elif kind == 'department' and len(args) == 1:
+            key = course_key(args[0])
+            return 200, {'Sections': only_campus(snapshot.department.get(key, [])),
+                         'Catalog': only_campus_courses(snapshot.catalog_department.get(key, []))}
+        elif kind == 'building' and len(args) == 1:
+            return 200, only_campus(snapshot.building.get(args[0].upper(), []))
+        elif kind == 'room' and len(args) == 2:
+            return 200, only_campus(snapshot.room.get((args[0].upper(), args[1].upper()), []))
+        return 404, {'Error': f'Unknown query: {path}'}
+
+
+class Handler(BaseHTTPRequestHandler):
+    """ Answers GET requests with the JSON result of 'Service.query' """
+
+    service = None
+    quiet = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, result = self.service.query(url.path, params)
+        except Exception as e:
+            status, result = 500, {'Error': f'{type(e).__name__}: {e}'}
+        body = json.dumps(result, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(service, host='127.0.0.1', port=8000, quiet=True):
+    """
+    Creates the HTTP server of a Service
+
+    @params
+
+        'service': The Service to answer queries with, started if it is not yet
+
+        'host', 'port': The address to listen on, port 0 picks a free port
+
+        'quiet': If False, every request is logged to stderr
+
+    Returns
+
+        A ThreadingHTTPServer, call 'serve_forever' to start answering requests
+    """
+    service.start()
+    handler = type('ServiceHandler', (Handler,), {'service': service, 'quiet': quiet})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host='127.0.0.1', port=8000, year=None, quarter=None, campuses=CAMPUS_NAMES,
+          refresh=900, use_cache=True, quiet=True):
+    """
+    Loads the data and answers queries until interrupted, see 'Service' and 'make_server'
+    """
+    service = Service(year, quarter, campuses, refresh, use_cache)
+    server = make_server(service, host, port, quiet)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,400 @@
+"""
+Splits scraping into (campus, year, quarter, department) work units that are handed out
+through a pluggable work queue, so several worker processes or hosts can share a refresh.
+Each worker writes one shard per unit and 'merge' combines the shards into one dataset.
+"""
+
+import os, re, abc, json, time, socket, hashlib, threading, importlib
+from zlib import compress, decompress
+import pandas as pd
+import concurrent.futures as cf
+from . import fetch
+from .columnar import Columns
+from .parse_schedules import (COURSE_KEYS, SCHEDULE_KEYS, plan_departments,
+                              parse_schedules, row_records)
+from .parse_courses import (CAMPUSES, COLUMN_NAMES, campus_departments, plan_catalog,
+                            check_campus, parse_department, catalog_frame, catalog_records)
+
+
+def unit_id(unit):
+    """
+    Returns
+
+        A deterministic, file name safe id for the given work unit
+    """
+    name = '-'.join(str(unit[k]) for k in ('kind', 'campus', 'year', 'quarter', 'department'))
+    digest = hashlib.sha1(json.dumps(unit, sort_keys=True).encode()).hexdigest()[:8]
+    return f"{re.sub(r'[^A-Za-z0-9]+', '_', name)}-{digest}"
+
+
+class WorkQueue(abc.ABC):
+    """
+    Interface of a work queue. A backend implements 'put', 'get', 'done' and 'fail';
+    'get' must hand every unit to only one worker at a time.
+    """
+
+    @abc.abstractmethod
+    def put(self, units):
+        """ Adds the given work units (dictionaries) to the queue """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self):
+        """
+        Claims the next unit
+
+        Returns
+
+            A (unit id, unit) tuple, or None if no unit is pending
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def done(self, uid):
+        """ Marks a claimed unit as finished """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fail(self, uid, error):
+        """ Marks a claimed unit as failed with the given error message """
+        raise NotImplementedError
+
+
+class MemoryQueue(WorkQueue):
+    """ In-process work queue, shared by worker threads """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.claimed = {}
+        self.finished = {}
+        self.failed = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, units):
+        with self.lock:
+            for unit in units:
+                uid = unit_id(unit)
+                if uid not in self.claimed and uid not in self.finished:
+                    self.pending[uid] = unit
+
+    def get(self):
+        with self.lock:
+            if not self.pending:
+                return None
+            uid = next(iter(self.pending))
+            unit = self.claimed[uid] = self.pending.pop(uid)
+            return uid, unit
+
+    def done(self, uid):
+        with self.lock:
+            self.finished[uid] = self.claimed.pop(uid)
+
+    def fail(self, uid, error):
+        with self.lock:
+            self.failed[uid] = (self.claimed.pop(uid), error)
+
+
+class FileQueue(WorkQueue):
+    """
+    Work queue stored in a directory, one JSON file per unit. Units are claimed by
+    atomically renaming them from 'pending' to 'claimed', so any number of processes,
+    or hosts sharing the directory, can pull from the same queue.
+
+    @params
+
+        'path': The queue directory, created if needed
+    """
+
+    STATES = ('pending', 'claimed', 'done', 'failed')
+
+    def __init__(self, path):
+        self.path = path
+        for state in self.STATES:
+            os.makedirs(os.path.join(path, state), exist_ok=True)
+
+    def _file(self, state, uid):
+        return os.path.join(self.path, state, f'{uid}.json')
+
+    def __len__(self):
+        # Files starting with '.' are units still being written by 'put'
+        return sum(1 for name in os.listdir(os.path.join(self.path, 'pending')) if not name.startswith('.'))
+
+    def put(self, units):
+        for unit in units:
+            uid = unit_id(unit)
+            if any(os.path.exists(self._file(state, uid)) for state in self.STATES):
+                continue
+            tmp = self._file('pending', f'.{uid}.{os.getpid()}')
+            with open(tmp, mode='w') as f:
+                json.dump(unit, f)
+            os.replace(tmp, self._file('pending', uid))
+
+    def get(self):
+        for name in sorted(os.listdir(os.path.join(self.path, 'pending'))):
+            if name.startswith('.'):
+                continue
+            uid = name[:-len('.json')]
+            try:
+                # The claim time is used by 'requeue' to find units of workers that died. It is
+                # set before the rename, so a unit is never claimed with an old time.
+                os.utime(self._file('pending', uid))
+                # Only one worker can win the rename, the others move on to the next unit
+                os.rename(self._file('pending', uid), self._file('claimed', uid))
+            except OSError:
+                continue
+            with open(self._file('claimed', uid)) as f:
+                return uid, json.load(f)
+        return None
+
+    def done(self, uid):
+        os.replace(self._file('claimed', uid), self._file('done', uid))
+
+    def fail(self, uid, error):
+        with open(self._file('claimed', uid)) as f:
+            unit = json.load(f)
+        unit['error'] = error
+        with open(self._file('failed', uid), mode='w') as f:
+            json.dump(unit, f)
+        os.remove(self._file('claimed', uid))
+
+    def requeue(self, older_than=600, failed=False):
+        """
+        Moves units claimed more than 'older_than' seconds ago (i.e. by a worker that died)
+        back to pending, and failed units as well if 'failed' is True
+
+        Returns
+
+            The number of units moved back to pending
+        """
+        moved = 0
+        now = time.time()
+        for name in os.listdir(os.path.join(self.path, 'claimed')):
+            path = os.path.join(self.path, 'claimed', name)
+            try:
+                if now - os.path.getmtime(path) > older_than:
+                    os.rename(path, os.path.join(self.path, 'pending', name))
+                    moved += 1
+            except OSError:
+                pass
+        if failed:
+            for name in os.listdir(os.path.join(self.path, 'failed')):
+                path = os.path.join(self.path, 'failed', name)
+                with open(path) as f:
+                    unit = json.load(f)
+                unit.pop('error', None)
+                uid = name[:-len('.json')]
+                tmp = self._file('pending', f'.{uid}.{os.getpid()}')
+                with open(tmp, mode='w') as f:
+                    json.dump(unit, f)
+                os.replace(tmp, self._file('pending', uid))
+                os.remove(path)
+                moved += 1
+        return moved
+
+
+def open_queue(spec):
+    """
+    Opens a work queue from a specification string
+
+    @params
+
+        'spec': Either a directory (FileQueue), or 'module:attribute' naming a WorkQueue
+                class or factory that is called without arguments
+
+    Returns
+
+        The WorkQueue
+    """
+    if ':' in spec and not os.path.isdir(spec) and not os.path.splitdrive(spec)[0]:
+        module, attribute = spec.split(':', 1)
+        return getattr(importlib.import_module(module), attribute)()
+    return FileQueue(spec)
+
+
+def schedule_units(year, quarter, campuses=['Seattle', 'Tacoma', 'Bothell']):
+    """
+    Plans the Time Schedule work units, one per department
+
+    @params
+
+        'year': The year to get time schedules from
+
+        'quarter': The quarter to get time schedules from
+
+        'campuses': The Campuses to get the Time Schedules from
+
+    Returns
+
+        A list of work units
+    """
+    units = []
+    with cf.ThreadPoolExecutor() as executor:
+        plans = {c.title(): executor.submit(plan_departments, c.title(), int(year), quarter) for c in campuses}
+    for campus, plan in plans.items():
+        for department, link in plan.result() or []:
+            units.append({'kind': 'schedule', 'campus': campus, 'year': int(year), 'quarter': quarter,
+                          'department': department, 'link': link})
+    return units
+
+
+def catalog_units(campuses=['Seattle', 'Bothell', 'Tacoma']):
+    """
+    Plans the Course Catalog work units, one per department
+
+    @params
+
+        'campuses': The Campuses to get the course catalogs from
+
+    Returns
+
+        A list of work units
+    """
+    units = []
+    campuses = [c.title() for c in campuses]
+    with cf.ThreadPoolExecutor() as executor:
+        sources = {c: executor.submit(fetch.get, CAMPUSES[c]) for c in campuses}
+    for campus, source in sources.items():
+        source = source.result().text
+        departments = {campus: campus_departments(source)}
+        for dep_file, department in plan_catalog(source):
+            units.append({'kind': 'catalog', 'campus': campus, 'year': None, 'quarter': None,
+                          'department': department, 'link': dep_file,
+                          'college': check_campus(department, departments, 'College')})
+    return units
+
+
+def process(unit, use_cache=True):
+    """
+    Downloads and parses the page of one work unit
+
+    @params
+
+        'unit': The work unit
+
+        'use_cache': Passed on to the page parser
+
+    Returns
+
+        The parsed rows
+    """
+    if unit['kind'] == 'schedule':
+        return parse_schedules(unit['link'], use_cache)
+    elif unit['kind'] == 'catalog':
+        return parse_department(unit['campus'], unit['link'], use_cache)
+    raise ValueError(f"Unknown work unit kind: {unit['kind']}")
+
+
+def work(queue, output, use_cache=True, delay=0, max_units=None, worker=None):
+    """
+    Pulls units from the queue until it is empty, writing one shard file per unit
+
+    @params
+
+        'queue': The WorkQueue to pull units from
+
+        'output': Directory the shard files are written to, shared by all workers
+
+        'use_cache': Passed on to the page parsers
+
+        'delay': Seconds to wait between units, to stay within a politeness budget
+
+        'max_units': Optional maximum number of units to process
+
+        'worker': Name recorded in the shards, defaults to host name and process id
+
+    Returns
+
+        The number of units processed
+    """
+    os.makedirs(output, exist_ok=True)
+    worker = worker or f'{socket.gethostname()}-{os.getpid()}'
+    processed = 0
+    while max_units is None or processed < max_units:
+        claimed = queue.get()
+        if claimed is None:
+            break
+        uid, unit = claimed
+        try:
+            rows = process(unit, use_cache)
+        except Exception as e:
+            queue.fail(uid, f'{type(e).__name__}: {e}')
+        else:
+            tmp = os.path.join(output, f'.{uid}.{worker}')
+            with open(tmp, mode='wb') as f:
+                f.write(compress(json.dumps({'unit': unit, 'worker': worker, 'rows': rows}).encode()))
+            os.replace(tmp, os.path.join(output, f'{uid}.file'))
+            queue.done(uid)
+        processed += 1
+        if delay:
+            time.sleep(delay)
+    return processed
+
+
+def read_shards(output, kind):
+    """ Reads every shard of the given kind in 'output', ordered by unit """
+    shards = []
+    for name in os.listdir(output):
+        if name.endswith('.file'):
+            with open(os.path.join(output, name), mode='rb') as f:
+                shard = json.loads(decompress(f.read()))
+            if shard['unit']['kind'] == kind:
+                shards.append(shard)
+    key = lambda s: tuple(str(s['unit'][k]) for k in ('campus', 'year', 'quarter', 'department', 'link'))
+    return sorted(shards, key=key)
+
+
+def merge(output, kind='schedule', struct='df'):
+    """
+    Combines the shards written by 'work' into one dataset. The result only depends on
+    the shards, not on which worker wrote them or in which order.
+
+    @params
+
+        'output': The directory the shards were written to
+
+        'kind': 'schedule' for Time Schedules, 'catalog' for Course Catalogs
+
+        'struct': 'df' -> Pandas DataFrame
+                  'dict' -> Python Dictionary
+
+    Returns
+
+        The merged dataset in the same layout as 'time_schedules' or 'course_catalogs'
+    """
+    assert kind in ['schedule', 'catalog'], f'{kind} is not a valid argument for "kind"'
+    assert struct in ['df', 'dict'], f'{struct} is not a valid argument for "struct"'
+    shards = read_shards(output, kind)
+    if kind == 'schedule' and struct == 'dict':
+        records = []
+        for shard in shards:
+            unit = shard['unit']
+            records.extend(row_records(shard['rows'], unit['campus'], unit['year'], unit['quarter']))
+        return records
+    elif kind == 'schedule':
+        columns = Columns(COURSE_KEYS)
+        campus, year, quarter = [], [], []
+        for shard in shards:
+            unit = shard['unit']
+            columns.extend(shard['rows'])
+            campus += [unit['campus']] * len(shard['rows'])
+            year += [unit['year']] * len(shard['rows'])
+            quarter += [unit['quarter']] * len(shard['rows'])
+        columns.add('Campus', campus)
+        columns.add('Year', year)
+        columns.add('Quarter', quarter)
+        merged = pd.DataFrame(columns.columns, columns=SCHEDULE_KEYS)
+        merged.index.name = 'Index'
+        return merged
+
+    columns = Columns(COLUMN_NAMES)
+    departments = {}
+    for shard in shards:
+        unit = shard['unit']
+        columns.extend(shard['rows'])
+        departments.setdefault(unit['campus'], {}).setdefault(unit['college'], {})[unit['department']] = ''
+    if struct == 'dict':
+        return catalog_records(columns, departments)
+    return catalog_frame(columns, departments)
@@ -0,0 +1,331 @@
+"""
+Finds near-identical courses across the UW Course Catalogs, i.e. the same course offered by
+Seattle, Bothell and Tacoma under different department codes.
+
+Every course is reduced to a MinHash signature of the word shingles of its 'Course Name'
+and 'Description'. Signatures are split into bands and courses sharing a band land in the
+same LSH bucket, so only courses in a shared bucket are compared instead of every pair.
+"""
+
+import json, base64, hashlib
+from zlib import compress, decompress, crc32
+import numpy as np
+import pandas as pd
+from .search import tokenize
+
+# Mersenne prime used by the MinHash permutations (a * x + b) % PRIME
+PRIME = (1 << 31) - 1
+
+# Columns of the similar course pairs
+PAIR_COLUMNS = ['Course ID', 'Campus', 'Similar Course ID', 'Similar Campus', 'Similarity']
+
+
+def shingles(text, size):
+    """
+    Returns
+
+        The hashes of the 'size' word shingles of the text
+    """
+    words = tokenize(text)
+    if len(words) < size:
+        words = words and [' '.join(words)]
+        size = 1
+    return {crc32(' '.join(words[i:i + size]).encode()) % PRIME for i in range(len(words) - size + 1)}
+
+
+class SimilarityIndex:
+    """
+    MinHash signatures and LSH buckets of course catalogs
+
+    @params
+
+        'catalog': Optional output of 'course_catalogs' (DataFrame or dictionary) to add
+
+        'permutations': Length of the MinHash signatures
+
+        'bands': Number of LSH bands, must divide 'permutations'. More bands find pairs
+                 with a lower similarity, at the cost of more candidates.
+
+        'shingle': Number of words per shingle
+
+        'seed': Seed of the MinHash permutations
+    """
+
+    def __init__(self, catalog=None, permutations=128, bands=32, shingle=2, seed=1):
+        assert permutations % bands == 0, '"bands" must divide "permutations"'
+        self.permutations = permutations
+        self.bands = bands
+        self.shingle = shingle
+        self.seed = seed
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, PRIME, size=permutations).astype(np.uint64)
+        self.b = generator.randint(0, PRIME, size=permutations).astype(np.uint64)
+
+        # Per course: (Campus, Course ID) -> position, and the course text digests.
+        # Removed courses leave None in 'keys' and 'digests' until the index is saved.
+        self.positions = {}
+        self.keys = []
+        self.digests = []
+        self.signatures = np.zeros((0, permutations), dtype=np.uint32)
+        self.buckets = {}
+        if catalog is not None:
+            self.add(catalog)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def signature(self, hashes):
+        """ Returns the MinHash signature of a set of shingle hashes """
+        if not hashes:
+            return None
+        x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        return ((self.a[:, None] * x[None, :] + self.b[:, None]) % PRIME).min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        rows = self.permutations // self.bands
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, catalog):
+        """
+        Adds or updates courses. Courses whose name and description did not change are
+        skipped, so adding a new catalog snapshot only hashes the courses that changed.
+
+        @params
+
+            'catalog': Output of 'course_catalogs' (DataFrame or dictionary)
+
+        Returns
+
+            The number of courses added or updated
+        """
+        if isinstance(catalog, pd.DataFrame):
+            catalog = catalog.to_dict(orient='index')
+        updates = {}
+        for course_id, course in catalog.items():
+            text = f"{course.get('Course Name') or ''} {course.get('Description') or ''}"
+            digest = hashlib.sha1(text.encode()).hexdigest()[:16]
+            key = (course.get('Campus'), course_id)
+            position = self.positions.get(key)
+            if position is not None:
+                if self.digests[position] == digest:
+                    continue
+                self.unbucket(position)
+                self.digests[position] = digest
+            else:
+                position = self.positions[key] = len(self.keys)
+                self.keys.append(key)
+                self.digests.append(digest)
+            updates[position] = self.signature(shingles(text, self.shingle))
+
+        if len(self.keys) > len(self.signatures):
+            grown = np.zeros((len(self.keys), self.permutations), dtype=np.uint32)
+            grown[:len(self.signatures)] = self.signatures
+            self.signatures = grown
+        for position, signature in updates.items():
+            self.store(position, signature)
+        return len(updates)
+
+    def remove(self, keys):
+        """
+        Removes courses, i.e. those dropped from the catalog
+
+        @params
+
+            'keys': The (Campus, Course ID) tuples of the courses to remove
+
+        Returns
+
+            The number of courses removed
+        """
+        removed = 0
+        for key in keys:
+            position = self.positions.pop(tuple(key), None)
+            if position is None:
+                continue
+            self.unbucket(position)
+            self.signatures[position] = 0
+            self.keys[position] = None
+            self.digests[position] = None
+            removed += 1
+        return removed
+
+    def store(self, position, signature):
+        # Courses without any words get an all zero signature and are never bucketed
+        if signature is None:
+            self.signatures[position] = 0
+            return
+        self.signatures[position] = signature
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, []).append(position)
+
+    def unbucket(self, position):
+        signature = self.signatures[position]
+        if signature.any():
+            for key in self.band_keys(signature):
+                bucket = self.buckets.get(key)
+                if bucket is not None and position in bucket:
+                    bucket.remove(position)
+                    if not bucket:
+                        del self.buckets[key]
+
+    def similarity(self, first, second):
+        """ Estimated Jaccard similarity of the courses at two positions """
+        return float(np.mean(self.signatures[first] == self.signatures[second]))
+
+    def candidates(self, position):
+        """ Returns the positions of the courses sharing an LSH bucket with a course """
+        signature = self.signatures[position]
+        found = set()
+        if signature.any():
+            for key in self.band_keys(signature):
+                found.update(self.buckets.get(key, ()))
+        found.discard(position)
+        return found
+
+    def similar_to(self, course_id, campus=None, threshold=0.5, cross_campus=True):
+        """
+        Finds the courses similar to one course
+
+        @params
+
+            'course_id': The Course ID, i.e. 'CSE142'
+
+            'campus': The campus of the course, needed if several campuses list it
+
+            'threshold': Lowest estimated similarity (0 to 1) of the returned courses
+
+            'cross_campus': If True, only courses of other campuses are returned
+
+        Returns
+
+            A list of (Campus, Course ID, similarity) tuples, most similar first
+        """
+        matches = [k for k in self.positions if k[1] == course_id and (campus is None or k[0] == campus)]
+        if not matches:
+            raise KeyError(f'{course_id} is not in the index')
+        position = self.positions[matches[0]]
+        found = []
+        for other in self.candidates(position):
+            if cross_campus and self.keys[other][0] == self.keys[position][0]:
+                continue
+            score = self.similarity(position, other)
+            if score >= threshold:
+                found.append((*self.keys[other], score))
+        return sorted(found, key=lambda f: (-f[2], str(f[0]), str(f[1])))
+
+    def pairs(self, threshold=0.5, cross_campus=True, max_bucket=500):
+        """
+        Finds every pair of similar courses
+
+        @params
+
+            'threshold': Lowest estimated similarity (0 to 1) of the returned pairs
+
+            'cross_campus': If True, only pairs of courses on different campuses are returned
+
+            'max_bucket': Buckets with more courses than this (i.e. shared boilerplate
+                          descriptions) are skipped to keep the comparisons near-linear
+
+        Returns
+
+            A pandas DataFrame with one row per pair, most similar first
+        """
+        seen = set()
+        rows = []
+        for bucket in self.buckets.values():
+            if len(bucket) < 2 or len(bucket) > max_bucket:
+                continue
+            for i, first in enumerate(bucket):
+                for second in bucket[i + 1:]:
+                    pair = (first, second) if first < second else (second, first)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                    if cross_campus and self.keys[first][0] == self.keys[second][0]:
+                        continue
+                    score = self.similarity(*pair)
+                    if score >= threshold:
+                        (campus, course), (other_campus, other) = self.keys[pair[0]], self.keys[pair[1]]
+                        rows.append([course, campus, other, other_campus, score])
+        pairs = pd.DataFrame(rows, columns=PAIR_COLUMNS)
+        return pairs.sort_values(['Similarity', 'Course ID', 'Similar Course ID'],
+                                 ascending=[False, True, True], ignore_index=True)
+
+    def save(self, path):
+        """
+        Stores the index in a zlib compressed file, see 'load'
+
+        @params
+
+            'path': The file to write the index to
+        """
+        # Positions of removed courses are left out
+        live = sorted(self.positions.values())
+        data = {
+            'permutations': self.permutations, 'bands': self.bands, 'shingle': self.shingle,
+            'seed': self.seed, 'keys': [self.keys[i] for i in live],
+            'digests': [self.digests[i] for i in live],
+            'signatures': base64.b64encode(self.signatures[live].tobytes()).decode()
+        }
+        with open(path, mode='wb') as f:
+            f.write(compress(json.dumps(data).encode()))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index stored with 'save'. More courses can be added to it with 'add'.
+
+        @params
+
+            'path': The file the index was written to
+
+        Returns
+
+            The loaded SimilarityIndex
+        """
+        with open(path, mode='rb') as f:
+            data = json.loads(decompress(f.read()))
+        index = cls(permutations=data['permutations'], bands=data['bands'],
+                    shingle=data['shingle'], seed=data['seed'])
+        index.keys = [tuple(k) for k in data['keys']]
+        index.positions = {k: i for i, k in enumerate(index.keys)}
+        index.digests = data['digests']
+        signatures = np.frombuffer(base64.b64decode(data['signatures']), dtype=np.uint32)
+        index.signatures = signatures.reshape(len(index.keys), index.permutations).copy()
+        # The buckets are rebuilt from the signatures instead of being stored
+        for position in range(len(index.keys)):
+            if index.signatures[position].any():
+                index.store(position, index.signatures[position])
+        return index
+
+
+def similar_courses(catalog, threshold=0.5, cross_campus=True, index=None):
+    """
+    Finds courses with near-identical names and descriptions, i.e. the same course
+    offered by several campuses under different department codes
+
+    @params
+
+        'catalog': Output of 'course_catalogs' (DataFrame or dictionary)
+
+        'threshold': Lowest estimated similarity (0 to 1) of the returned pairs
+
+        'cross_campus': If True, only pairs of courses on different campuses are returned
+
+        'index': Optional SimilarityIndex (i.e. loaded with 'SimilarityIndex.load') that
+                 the catalog is added to, only changed courses are hashed again. Courses
+                 of the index that are not in the catalog are removed from it.
+
+    Returns
+
+        A pandas DataFrame of the similar pairs with their 'Course ID', 'Campus',
+        'Similar Course ID', 'Similar Campus' and estimated 'Similarity', most similar first
+    """
+    if index is None:
+        index = SimilarityIndex()
+    if isinstance(catalog, pd.DataFrame):
+        catalog = catalog.to_dict(orient='index')
+    index.remove(set(index.positions) - {(course.get('Campus'), course_id)
+                                         for course_id, course in catalog.items()})
+    index.add(catalog)
+    return index.pairs(threshold, cross_campus)